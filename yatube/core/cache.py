@@ -0,0 +1,132 @@
+"""Бэкенды кэша Django, которые считают попадания по префиксам ключей.
+
+Счетчики копятся в процессе и периодически сбрасываются в сам кэш,
+поэтому команда cache_stats видит сумму по всем воркерам.
+"""
+import threading
+from collections import Counter
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache.backends import db, filebased, locmem, memcached
+
+STATS_PREFIX = 'cache_stats'
+PREFIXES_KEY = f'{STATS_PREFIX}:prefixes'
+_MISSING = object()
+
+
+def key_prefix(key):
+    return key.split(':', 1)[0]
+
+
+def stats_key(prefix, kind):
+    return f'{STATS_PREFIX}:{prefix}:{kind}'
+
+
+class StatsCacheMixin:
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats = Counter()
+        self._stats_lock = threading.Lock()
+        self._pending = 0
+        self._local = threading.local()
+
+    @contextmanager
+    def _outermost(self):
+        # бэкенды реализуют get через get_many и наоборот, а считать
+        # нужно только внешний вызов
+        depth = getattr(self._local, 'depth', 0)
+        self._local.depth = depth + 1
+        try:
+            yield depth == 0
+        finally:
+            self._local.depth = depth
+
+    def get(self, key, default=None, version=None):
+        with self._outermost() as outermost:
+            value = super().get(key, _MISSING, version)
+        if outermost:
+            self.record(key, hits=int(value is not _MISSING))
+        return default if value is _MISSING else value
+
+    def get_many(self, keys, version=None):
+        with self._outermost() as outermost:
+            found = super().get_many(keys, version)
+        if outermost:
+            for key in keys:
+                self.record(key, hits=int(key in found))
+        return found
+
+    def record(self, key, hits):
+        prefix = key_prefix(key)
+        if prefix == STATS_PREFIX:
+            return
+        with self._stats_lock:
+            self._stats[prefix, 'hits'] += hits
+            self._stats[prefix, 'misses'] += 1 - hits
+            self._pending += 1
+            if self._pending < settings.CACHE_STATS_FLUSH_EVERY:
+                return
+            pending, self._stats, self._pending = self._stats, Counter(), 0
+        self.flush_stats(pending)
+
+    def flush_stats(self, pending=None):
+        if pending is None:
+            with self._stats_lock:
+                pending, self._stats, self._pending = (
+                    self._stats, Counter(), 0)
+        prefixes = set(super().get(PREFIXES_KEY, None) or ())
+        for (prefix, kind), amount in pending.items():
+            key = stats_key(prefix, kind)
+            if not super().add(key, amount, None):
+                super().incr(key, amount)
+            prefixes.add(prefix)
+        super().set(PREFIXES_KEY, prefixes, None)
+
+    def read_stats(self):
+        self.flush_stats()
+        prefixes = super().get(PREFIXES_KEY, None) or ()
+        return {
+            prefix: (
+                super(StatsCacheMixin, self).get(
+                    stats_key(prefix, 'hits'), 0),
+                super(StatsCacheMixin, self).get(
+                    stats_key(prefix, 'misses'), 0),
+            )
+            for prefix in sorted(prefixes)
+        }
+
+    def reset_stats(self):
+        prefixes = super().get(PREFIXES_KEY, None) or ()
+        super().delete_many(
+            [stats_key(prefix, kind)
+             for prefix in prefixes for kind in ('hits', 'misses')]
+            + [PREFIXES_KEY]
+        )
+        with self._stats_lock:
+            self._stats, self._pending = Counter(), 0
+
+
+class LocMemCache(StatsCacheMixin, locmem.LocMemCache):
+    pass
+
+
+class FileBasedCache(StatsCacheMixin, filebased.FileBasedCache):
+    pass
+
+
+class DatabaseCache(StatsCacheMixin, db.DatabaseCache):
+    pass
+
+
+class MemcachedCache(StatsCacheMixin, memcached.MemcachedCache):
+    pass
+
+
+try:
+    from django_redis.cache import RedisCache as BaseRedisCache
+except ImportError:
+    BaseRedisCache = None
+else:
+    class RedisCache(StatsCacheMixin, BaseRedisCache):
+        pass
@@ -0,0 +1,30 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Показывает долю попаданий в кэш по префиксам ключей'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--alias', default='default')
+        parser.add_argument(
+            '--reset', action='store_true',
+            help='Обнулить накопленную статистику'
+        )
+
+    def handle(self, *args, **options):
+        cache = caches[options['alias']]
+        if not hasattr(cache, 'read_stats'):
+            raise CommandError(
+                f'Бэкенд {cache.__class__.__name__} не собирает статистику')
+        if options['reset']:
+            cache.reset_stats()
+            self.stdout.write('Статистика обнулена')
+            return
+        self.stdout.write(f'{"префикс":<50} {"попадания":>10} '
+                          f'{"промахи":>10} {"доля":>6}')
+        for prefix, (hits, misses) in cache.read_stats().items():
+            total = hits + misses
+            ratio = hits / total if total else 0
+            self.stdout.write(
+                f'{prefix:<50} {hits:>10} {misses:>10} {ratio:>6.1%}')
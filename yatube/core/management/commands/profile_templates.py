@@ -0,0 +1,48 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+from django.test import Client, override_settings
+
+from core.metrics import registry
+
+
+class Command(BaseCommand):
+    help = 'Показывает, сколько времени рендерится каждый шаблон страницы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Адрес страницы, например /')
+        parser.add_argument('--requests', type=int, default=20)
+        parser.add_argument(
+            '--user', help='Открывать страницу от имени пользователя')
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом'
+        )
+
+    def handle(self, *args, **options):
+        # тестовый Host testserver не пройдет проверку ALLOWED_HOSTS
+        client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+        if options['user']:
+            User = get_user_model()
+            try:
+                client.force_login(
+                    User.objects.get(username=options['user']))
+            except User.DoesNotExist:
+                raise CommandError(f'Нет пользователя {options["user"]}')
+        registry.reset()
+        with override_settings(METRICS_TEMPLATE_PROFILING=True):
+            for _ in range(options['requests']):
+                if options['cold']:
+                    cache.clear()
+                response = client.get(options['path'])
+                if response.status_code != 200:
+                    raise CommandError(f'Ответ {response.status_code}')
+        requests = options['requests']
+        self.stdout.write(
+            f'{"шаблон":<40} {"рендеров":>9} {"всего, мс":>10} '
+            f'{"свое, мс":>10}')
+        for name, (count, elapsed, own) in registry.template_snapshot():
+            self.stdout.write(
+                f'{name:<40} {count / requests:>9.1f} '
+                f'{elapsed / requests:>10.2f} {own / requests:>10.2f}')
@@ -0,0 +1,26 @@
+import sqlite3
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную SQLite-базу в файлы локальных реплик'
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError('Реплики не настроены: задайте YATUBE_REPLICAS')
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError(
+                'Реплики других СУБД синхронизирует сама база данных')
+        primary.ensure_connection()
+        for alias in settings.DATABASE_REPLICAS:
+            connections[alias].close()
+            target = sqlite3.connect(connections[alias].settings_dict['NAME'])
+            try:
+                primary.connection.backup(target)
+            finally:
+                target.close()
+            self.stdout.write(f'{alias} обновлена')
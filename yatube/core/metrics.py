@@ -0,0 +1,226 @@
+"""Замеры запросов: время ответа, SQL и рендер шаблонов по view_name.
+
+Данные живут в памяти процесса, у каждого воркера своя скользящая
+выборка последних METRICS_WINDOW запросов на каждую страницу.
+С METRICS_TEMPLATE_PROFILING время считается еще и по каждому шаблону
+и include: полное и собственное, без вложенных шаблонов. Блоки,
+унаследованные через extends, попадают в родительский шаблон.
+"""
+import math
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.template.base import Template
+
+UNRESOLVED = '<unresolved>'
+UNNAMED = '<string>'
+QUANTILES = (0.5, 0.95, 0.99)
+FIELDS = ('wall', 'sql', 'template')
+
+_local = threading.local()
+
+
+class RequestTimings:
+    """Что удалось замерить за один запрос; время в миллисекундах."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.wall = 0.0
+        self.sql = 0.0
+        self.queries = 0
+        self.template = 0.0
+        self._template_depth = 0
+        self.profile_templates = settings.METRICS_TEMPLATE_PROFILING
+        # имя шаблона → [рендеров, полное время, собственное время]
+        self.templates = defaultdict(lambda: [0, 0.0, 0.0])
+        self._template_stack = []
+
+    def execute(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql += (time.perf_counter() - started) * 1000
+            self.queries += 1
+
+    def enter_template(self):
+        self._template_stack.append([time.perf_counter(), 0.0])
+
+    def leave_template(self, name):
+        started, children = self._template_stack.pop()
+        elapsed = (time.perf_counter() - started) * 1000
+        if self._template_stack:
+            self._template_stack[-1][1] += elapsed
+        stats = self.templates[name]
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] += elapsed - children
+
+    def finish(self):
+        self.wall = (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self):
+        return ', '.join((
+            f'total;dur={self.wall:.1f}',
+            f'sql;dur={self.sql:.1f};desc="{self.queries} queries"',
+            f'template;dur={self.template:.1f}',
+        ))
+
+
+def current():
+    return getattr(_local, 'timings', None)
+
+
+@contextmanager
+def collect():
+    timings = _local.timings = RequestTimings()
+    try:
+        yield timings
+    finally:
+        _local.timings = None
+        timings.finish()
+
+
+def _instrumented_render(render):
+    def wrapper(self, context):
+        timings = current()
+        if timings is None:
+            return render(self, context)
+        # вложенные include считаются в составе внешнего шаблона
+        timings._template_depth += 1
+        started = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            timings._template_depth -= 1
+            if not timings._template_depth:
+                timings.template += (time.perf_counter() - started) * 1000
+
+    wrapper.instrumented = True
+    return wrapper
+
+
+def _profiled_render(render):
+    def wrapper(self, context):
+        timings = current()
+        if timings is None or not timings.profile_templates:
+            return render(self, context)
+        timings.enter_template()
+        try:
+            return render(self, context)
+        finally:
+            timings.leave_template(template_name(self))
+
+    wrapper.instrumented = True
+    return wrapper
+
+
+def template_name(template):
+    return template.origin.template_name or template.name or UNNAMED
+
+
+def instrument_templates():
+    if not getattr(Template.render, 'instrumented', False):
+        Template.render = _instrumented_render(Template.render)
+    # _render вызывается и для include, и для родителей из extends
+    if not getattr(Template._render, 'instrumented', False):
+        Template._render = _profiled_render(Template._render)
+
+
+def percentile(values, fraction):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    return ordered[max(math.ceil(fraction * len(ordered)) - 1, 0)]
+
+
+class Registry:
+    """Скользящие выборки и накопительные счетчики по страницам."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._windows = defaultdict(
+                lambda: deque(maxlen=settings.METRICS_WINDOW))
+            self._totals = defaultdict(lambda: defaultdict(float))
+            self._templates = defaultdict(lambda: [0, 0.0, 0.0])
+
+    def record(self, view_name, timings):
+        with self._lock:
+            self._windows[view_name].append(
+                (timings.wall, timings.sql, timings.template))
+            totals = self._totals[view_name]
+            totals['requests'] += 1
+            totals['queries'] += timings.queries
+            for field in FIELDS:
+                totals[field] += getattr(timings, field)
+            for name, stats in timings.templates.items():
+                self._templates[name] = [
+                    total + value
+                    for total, value in zip(self._templates[name], stats)
+                ]
+
+    def template_snapshot(self):
+        """Шаблоны по убыванию собственного времени рендера."""
+        with self._lock:
+            rows = {
+                name: list(stats) for name, stats in self._templates.items()}
+        return sorted(rows.items(), key=lambda row: -row[1][2])
+
+    def snapshot(self):
+        with self._lock:
+            windows = {
+                name: list(rows) for name, rows in self._windows.items()}
+            totals = {name: dict(rows) for name, rows in self._totals.items()}
+        return {
+            name: {
+                'totals': totals[name],
+                'quantiles': {
+                    field: {
+                        quantile: percentile(
+                            [row[index] for row in rows], quantile)
+                        for quantile in QUANTILES
+                    }
+                    for index, field in enumerate(FIELDS)
+                },
+            }
+            for name, rows in sorted(windows.items())
+        }
+
+    def render(self):
+        """Текст в формате Prometheus."""
+        lines = []
+        for name, data in self.snapshot().items():
+            label = f'view="{name}"'
+            totals = data['totals']
+            lines.append(
+                f'yatube_requests_total{{{label}}} {int(totals["requests"])}')
+            lines.append(
+                f'yatube_sql_queries_total{{{label}}} '
+                f'{int(totals["queries"])}')
+            for field in FIELDS:
+                lines.append(
+                    f'yatube_{field}_seconds_sum{{{label}}} '
+                    f'{totals[field] / 1000:.6f}')
+                for quantile, value in data['quantiles'][field].items():
+                    lines.append(
+                        f'yatube_{field}_seconds'
+                        f'{{{label},quantile="{quantile}"}} '
+                        f'{value / 1000:.6f}')
+        for name, (count, elapsed, own) in self.template_snapshot():
+            label = f'template="{name}"'
+            lines.append(f'yatube_template_renders_total{{{label}}} {count}')
+            lines.append(
+                f'yatube_template_seconds_sum{{{label}}} {elapsed / 1000:.6f}')
+            lines.append(
+                f'yatube_template_self_seconds_sum{{{label}}} '
+                f'{own / 1000:.6f}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
@@ -0,0 +1,96 @@
+import time
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+from . import metrics
+from .querylog import inspect_queries
+from .routers import use_replicas
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def resolved_view_name(request):
+    match = request.resolver_match
+    return match.view_name if match else metrics.UNRESOLVED
+
+
+class RequestMetricsMiddleware:
+    """Замеряет каждый запрос и отдает итог в заголовке Server-Timing.
+
+    SQL перехватывается через execute_wrapper на всех подключениях,
+    поэтому замеры работают и с DEBUG=False.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        metrics.instrument_templates()
+
+    def __call__(self, request):
+        with ExitStack() as stack:
+            timings = stack.enter_context(metrics.collect())
+            for connection in connections.all():
+                stack.enter_context(
+                    connection.execute_wrapper(timings.execute))
+            response = self.get_response(request)
+        view_name = resolved_view_name(request)
+        if view_name != 'metrics':
+            metrics.registry.record(view_name, timings)
+        response['Server-Timing'] = timings.server_timing()
+        return response
+
+
+class QueryInspectorMiddleware:
+    """Пишет в журнал медленные запросы и N+1 на каждой странице.
+
+    С QUERY_DUPLICATES_RAISE повторяющиеся запросы роняют ответ,
+    что удобно в тестах. Имя view известно до ее вызова, поэтому
+    медленные запросы самой view уже подписаны им.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with inspect_queries() as inspector:
+            request._query_inspector = inspector
+            response = self.get_response(request)
+            if not inspector.label:
+                inspector.label = resolved_view_name(request)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request._query_inspector.label = resolved_view_name(request)
+
+
+class ReplicaMiddleware:
+    """Отправляет чтения безопасных запросов на реплики.
+
+    После того как запрос что-то записал, пользователь получает cookie
+    и REPLICA_STICKY_SECONDS читает с основной базы, чтобы сразу увидеть
+    свои изменения несмотря на отставание реплик.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def is_sticky(self, request):
+        try:
+            until = float(request.COOKIES[settings.REPLICA_STICKY_COOKIE])
+        except (KeyError, ValueError):
+            return False
+        return until > time.time()
+
+    def __call__(self, request):
+        enabled = (
+            request.method in SAFE_METHODS and not self.is_sticky(request))
+        with use_replicas(enabled) as state:
+            response = self.get_response(request)
+        if state['wrote'] and settings.DATABASE_REPLICAS:
+            seconds = settings.REPLICA_STICKY_SECONDS
+            response.set_cookie(
+                settings.REPLICA_STICKY_COOKIE, str(time.time() + seconds),
+                max_age=seconds, httponly=True, samesite='Lax',
+            )
+        return response
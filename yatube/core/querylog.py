@@ -0,0 +1,119 @@
+"""Журнал медленных и повторяющихся SQL-запросов.
+
+Запросы сводятся к отпечатку без литералов, и если один отпечаток
+за запрос к странице выполняется больше QUERY_DUPLICATE_THRESHOLD раз,
+это почти наверняка N+1. Для таких и для медленных запросов в журнал
+пишется, из какого шаблона и какого кода проекта они пришли.
+"""
+import logging
+import os
+import re
+import sys
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.conf import settings
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+STRING_RE = re.compile(r"'(?:[^']|'')*'")
+NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+IN_LIST_RE = re.compile(r'\bIN \((?:\s*(?:%s|\?)\s*,?)+\)', re.IGNORECASE)
+SPACE_RE = re.compile(r'\s+')
+MAX_STACK = 8
+# обертки самой инструментации в стеке вызовов не интересны
+SKIPPED_FILES = ('core/metrics.py', 'core/middleware.py', 'manage.py')
+
+
+class DuplicateQueriesError(AssertionError):
+    pass
+
+
+def fingerprint(sql):
+    """SQL без значений: одинаковые запросы с разными id совпадают."""
+    sql = STRING_RE.sub('?', sql)
+    sql = NUMBER_RE.sub('?', sql)
+    sql = IN_LIST_RE.sub('IN (...)', sql)
+    return SPACE_RE.sub(' ', sql).strip()
+
+
+def call_stack():
+    """Шаблоны и строки кода проекта, из которых выполнен запрос."""
+    base_dir = os.path.join(str(settings.BASE_DIR), '')
+    own_path = __file__[len(base_dir):]
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < MAX_STACK:
+        code = frame.f_code
+        owner = frame.f_locals.get('self')
+        if code.co_name == 'render' and isinstance(owner, Template):
+            frames.append(f'template {owner.name}')
+        elif code.co_filename.startswith(base_dir):
+            path = code.co_filename[len(base_dir):]
+            if not (path in SKIPPED_FILES or path == own_path
+                    or '/tests/' in path):
+                frames.append(f'{path}:{frame.f_lineno} in {code.co_name}')
+        frame = frame.f_back
+    return frames
+
+
+class QueryInspector:
+    def __init__(self, label='', strict=None):
+        self.label = label
+        self.strict = (
+            settings.QUERY_DUPLICATES_RAISE if strict is None else strict)
+        self.threshold = settings.QUERY_DUPLICATE_THRESHOLD
+        self.counts = Counter()
+        self.stacks = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, (time.perf_counter() - started) * 1000)
+
+    def record(self, sql, elapsed):
+        key = fingerprint(sql)
+        self.counts[key] += 1
+        if self.counts[key] == self.threshold + 1:
+            self.stacks[key] = call_stack()
+        if elapsed >= settings.QUERY_SLOW_MS:
+            logger.warning(
+                'Медленный запрос %.1f мс на %s: %s\n  %s',
+                elapsed, self.label, key, '\n  '.join(call_stack()))
+
+    @property
+    def duplicates(self):
+        return {
+            key: count for key, count in self.counts.items()
+            if count > self.threshold and not any(
+                table in key for table in settings.QUERY_DUPLICATE_IGNORE)
+        }
+
+    def report(self):
+        duplicates = self.duplicates
+        if not duplicates:
+            return
+        message = '\n'.join(
+            f'{count} раз: {key}\n  ' + '\n  '.join(self.stacks[key])
+            for key, count in duplicates.items()
+        )
+        message = f'Повторяющиеся запросы на {self.label}:\n{message}'
+        if self.strict:
+            raise DuplicateQueriesError(message)
+        logger.warning(message)
+
+
+@contextmanager
+def inspect_queries(label='', strict=None):
+    """Следит за запросами во всех подключениях внутри блока."""
+    inspector = QueryInspector(label, strict)
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(inspector))
+        yield inspector
+    inspector.report()
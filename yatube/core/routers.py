@@ -0,0 +1,70 @@
+"""Чтение с реплик и запись в основную базу.
+
+На реплики уходят только чтения моделей из REPLICA_APPS внутри запросов,
+для которых их включил ReplicaMiddleware, и только вне транзакций.
+Команды, фоновые задачи и тесты без middleware работают с основной базой.
+"""
+import random
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_local = threading.local()
+
+
+@contextmanager
+def use_replicas(enabled=True):
+    """Разрешает чтение с реплик внутри блока и запоминает, была ли запись."""
+    previous = getattr(_local, 'state', None)
+    state = _local.state = {'replicas': enabled, 'wrote': False}
+    try:
+        yield state
+    finally:
+        _local.state = previous
+        if previous is not None:
+            previous['wrote'] |= state['wrote']
+
+
+def reading_replicas():
+    """Могут ли чтения текущего блока прийти с реплики.
+
+    Такие данные бывают старше версий кэша, поэтому их нельзя сохранять
+    под текущей версией и нельзя выдавать по ним ETag.
+    """
+    state = getattr(_local, 'state', None)
+    return bool(
+        settings.DATABASE_REPLICAS and state is not None
+        and state['replicas'] and not state['wrote']
+    )
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = getattr(_local, 'state', None)
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas or state is None or not state['replicas']
+                or state['wrote']
+                or model._meta.app_label not in settings.REPLICA_APPS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = getattr(_local, 'state', None)
+        if state is not None:
+            state['wrote'] = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # реплики — копии основной базы, связи между ними допустимы
+        aliases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if {obj1._state.db, obj2._state.db} <= aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
@@ -0,0 +1,25 @@
+"""Настройка соединений SQLite для нагрузки с параллельными читателями.
+
+WAL позволяет читать во время записи, synchronous=NORMAL в режиме WAL
+не теряет целостность, а busy_timeout заставляет писателей подождать
+вместо немедленной ошибки database is locked.
+"""
+import re
+
+from django.conf import settings
+
+PRAGMA_NAME_RE = re.compile(r'^[a-z_]+$')
+
+
+def pragma_statements(pragmas):
+    for name, value in pragmas.items():
+        if not PRAGMA_NAME_RE.match(name):
+            raise ValueError(f'Неверное имя PRAGMA: {name}')
+        yield f'PRAGMA {name} = {value}'
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite' or not settings.SQLITE_TUNING:
+        return
+    for statement in pragma_statements(settings.SQLITE_PRAGMAS):
+        connection.connection.execute(statement)
@@ -0,0 +1,38 @@
+from io import StringIO
+
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+
+from core.cache import StatsCacheMixin
+
+
+@override_settings(CACHE_STATS_FLUSH_EVERY=1)
+class CacheStatsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        cache.reset_stats()
+
+    def test_default_cache_collects_stats(self):
+        """кэш по умолчанию считает попадания и промахи по префиксам"""
+        self.assertIsInstance(caches['default'], StatsCacheMixin)
+        cache.set('post_card:1', 'html')
+        cache.get('post_card:1')
+        cache.get('post_card:2')
+        cache.get_many(['post_card:1', 'version:1'])
+        self.assertEqual(cache.read_stats(), {
+            'post_card': (2, 1),
+            'version': (0, 1),
+        })
+
+    def test_cache_stats_command(self):
+        """команда cache_stats выводит долю попаданий"""
+        cache.set('post_card:1', 'html')
+        cache.get('post_card:1')
+        cache.get('post_card:2')
+        out = StringIO()
+        call_command('cache_stats', stdout=out)
+        self.assertIn('post_card', out.getvalue())
+        self.assertIn('50.0%', out.getvalue())
+        call_command('cache_stats', '--reset', stdout=StringIO())
+        self.assertEqual(cache.read_stats(), {})
@@ -0,0 +1,77 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import percentile, registry
+
+User = get_user_model()
+
+
+class RequestMetricsTests(TestCase):
+    def setUp(self):
+        registry.reset()
+
+    def timing(self, response):
+        return dict(
+            (part.split(';')[0], part)
+            for part in response['Server-Timing'].split(', ')
+        )
+
+    def test_server_timing_header(self):
+        """ответ содержит общее время, SQL и рендер шаблонов"""
+        User.objects.create_user('author')
+        response = self.client.get(
+            reverse('posts:profile', kwargs={'username': 'author'}))
+        timing = self.timing(response)
+        self.assertEqual(set(timing), {'total', 'sql', 'template'})
+        self.assertRegex(timing['sql'], r'desc="[1-9]\d* queries"')
+
+    @override_settings(DEBUG=False)
+    def test_records_by_view_name(self):
+        """замеры копятся по view_name и без DEBUG"""
+        for _ in range(3):
+            self.client.get(reverse('about:author'))
+        self.client.get('/no-such-page/')
+        data = registry.snapshot()
+        self.assertEqual(data['about:author']['totals']['requests'], 3)
+        self.assertIn('<unresolved>', data)
+        self.assertGreater(
+            data['about:author']['quantiles']['template'][0.5], 0)
+
+    def test_metrics_endpoint(self):
+        """/_metrics отдает текст для Prometheus и не считает сам себя"""
+        self.client.get(reverse('about:author'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        self.assertIn('yatube_requests_total{view="about:author"} 1', text)
+        self.assertIn(
+            'yatube_wall_seconds{view="about:author",quantile="0.95"}', text)
+        self.assertNotIn('view="metrics"', text)
+
+    @override_settings(METRICS_ALLOWED_IPS=())
+    def test_metrics_endpoint_is_private(self):
+        """/_metrics недоступен с чужих адресов"""
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_ALLOWED_IPS=(), METRICS_TOKEN='secret')
+    def test_metrics_endpoint_token_and_staff(self):
+        """/_metrics открыт по токену и персоналу, а не всем подряд"""
+        url = reverse('metrics')
+        for header, status in (
+                ('Bearer secret', 200), ('Bearer wrong', 404), ('', 404)):
+            with self.subTest(header=header):
+                response = self.client.get(url, HTTP_AUTHORIZATION=header)
+                self.assertEqual(response.status_code, status)
+        self.client.force_login(User.objects.create_user('user'))
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(
+            User.objects.create_user('staff', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_percentile(self):
+        """перцентили считаются методом ближайшего ранга"""
+        self.assertEqual(percentile([3, 1, 2], 0.5), 2)
+        self.assertEqual(percentile(list(range(1, 101)), 0.99), 99)
@@ -0,0 +1,86 @@
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse
+from django.template import Context, Template
+from django.test import TestCase, override_settings
+from django.urls import path, reverse
+
+from core.querylog import (
+    DuplicateQueriesError, fingerprint, inspect_queries
+)
+
+User = get_user_model()
+
+
+def n_plus_one(request):
+    groups = [user.groups.count() for user in User.objects.all()]
+    return HttpResponse(str(sum(groups)))
+
+
+urlpatterns = [path('n-plus-one/', n_plus_one, name='n_plus_one')]
+
+
+@override_settings(QUERY_DUPLICATE_THRESHOLD=2, QUERY_SLOW_MS=10 ** 6)
+class QueryInspectorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        for number in range(4):
+            User.objects.create_user(f'user{number}')
+
+    def test_fingerprint(self):
+        """отпечаток не зависит от значений в запросе"""
+        self.assertEqual(
+            fingerprint("SELECT * FROM t WHERE id = 1 AND name = 'a''b'"),
+            fingerprint("SELECT *  FROM t\nWHERE id = 25 AND name = 'c'"),
+        )
+        self.assertEqual(
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s)'),
+            fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s)'),
+        )
+
+    def test_duplicates_are_reported_with_template(self):
+        """N+1 из шаблона находится и указывает на шаблон"""
+        template = Template(
+            '{% for user in users %}{{ user.groups.count }}{% endfor %}',
+            name='n_plus_one.html')
+        with self.assertRaises(DuplicateQueriesError) as error:
+            with inspect_queries('test', strict=True):
+                template.render(Context({'users': User.objects.all()}))
+        self.assertIn('4 раз', str(error.exception))
+        self.assertIn('template n_plus_one.html', str(error.exception))
+
+    def test_duplicates_are_logged(self):
+        """без strict повторы только пишутся в журнал"""
+        with self.assertLogs('core.querylog', 'WARNING') as logs:
+            with inspect_queries('test', strict=False) as inspector:
+                for user in User.objects.all():
+                    user.groups.exists()
+        self.assertEqual(list(inspector.duplicates.values()), [4])
+        self.assertIn('Повторяющиеся запросы на test', logs.output[0])
+
+    @override_settings(QUERY_SLOW_MS=0)
+    def test_slow_queries_are_logged(self):
+        """медленные запросы пишутся в журнал вместе с отпечатком"""
+        with self.assertLogs('core.querylog', 'WARNING') as logs:
+            with inspect_queries('test'):
+                User.objects.filter(username='user1').exists()
+        self.assertIn('Медленный запрос', logs.output[0])
+        self.assertIn('"username" = ?', logs.output[0].replace('%s', '?'))
+
+    @override_settings(QUERY_DUPLICATES_RAISE=True)
+    def test_middleware_fails_in_strict_mode(self):
+        """в строгом режиме страница без N+1 отвечает как обычно"""
+        response = self.client.get(reverse('about:author'))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(
+        QUERY_DUPLICATES_RAISE=True, QUERY_SLOW_MS=0, ROOT_URLCONF=__name__)
+    def test_middleware_raises_on_n_plus_one(self):
+        """в строгом режиме N+1 на странице роняет ответ"""
+        with self.assertLogs('core.querylog', 'WARNING') as logs:
+            with self.assertRaises(DuplicateQueriesError) as error:
+                self.client.get(reverse('n_plus_one'))
+        self.assertIn('на n_plus_one', str(error.exception))
+        # запросы самой view подписаны ее именем еще до ответа
+        self.assertIn('Медленный запрос', logs.output[0])
+        self.assertIn('на n_plus_one', logs.output[0])
@@ -0,0 +1,93 @@
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.models import Session
+from django.core.cache.backends.db import DatabaseCache
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.middleware import ReplicaMiddleware
+from core.routers import ReplicaRouter, reading_replicas, use_replicas
+from posts.models import Post
+
+User = get_user_model()
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRouterTests(SimpleTestCase):
+    # TestCase держит тест в транзакции, а в ней реплики не используются
+    databases = {'default'}
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def test_reads_outside_requests_use_primary(self):
+        """без middleware все читается с основной базы"""
+        self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_reads_go_to_replicas_until_write(self):
+        """чтения идут на реплику, после записи — на основную базу"""
+        with use_replicas():
+            self.assertEqual(self.router.db_for_read(Post), 'replica_1')
+            with transaction.atomic():
+                self.assertEqual(self.router.db_for_read(Post), 'default')
+            self.assertEqual(self.router.db_for_write(Post), 'default')
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_auth_sessions_and_cache_use_primary(self):
+        """сессии, пользователи и таблица кэша читаются с основной базы"""
+        cache_model = DatabaseCache('yatube_cache', {}).cache_model_class
+        with use_replicas():
+            for model in (Session, User, cache_model):
+                with self.subTest(model=model.__name__):
+                    self.assertEqual(
+                        self.router.db_for_read(model), 'default')
+
+    def test_reading_replicas(self):
+        """реплики читаются только в запросе, до записи и без отключения"""
+        self.assertFalse(reading_replicas())
+        with use_replicas():
+            self.assertTrue(reading_replicas())
+            with use_replicas(False):
+                self.assertFalse(reading_replicas())
+            self.router.db_for_write(Post)
+            self.assertFalse(reading_replicas())
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        """без реплик роутер не вмешивается"""
+        with use_replicas():
+            self.assertEqual(self.router.db_for_read(Post), 'default')
+
+    def test_replicas_are_not_migrated(self):
+        """миграции на реплики не применяются"""
+        self.assertFalse(self.router.allow_migrate('replica_1', 'posts'))
+        self.assertIsNone(self.router.allow_migrate('default', 'posts'))
+
+    def run_request(self, method='get', write=False, cookies=None):
+        used = []
+
+        def view(request):
+            used.append(self.router.db_for_read(Post))
+            if write:
+                self.router.db_for_write(Post)
+            return HttpResponse()
+
+        request = getattr(self.factory, method)('/')
+        request.COOKIES.update(cookies or {})
+        response = ReplicaMiddleware(view)(request)
+        return used[0], response
+
+    def test_middleware_sticks_to_primary_after_write(self):
+        """после записи пользователь какое-то время читает с основной базы"""
+        alias, response = self.run_request()
+        self.assertEqual(alias, 'replica_1')
+        self.assertNotIn('primary_until', response.cookies)
+        alias, response = self.run_request('post', write=True)
+        self.assertEqual(alias, 'default')
+        cookie = response.cookies['primary_until']
+        self.assertEqual(cookie['max-age'], 10)
+        alias, _ = self.run_request(cookies={'primary_until': cookie.value})
+        self.assertEqual(alias, 'default')
+        alias, _ = self.run_request(cookies={'primary_until': '0'})
+        self.assertEqual(alias, 'replica_1')
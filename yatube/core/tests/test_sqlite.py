@@ -0,0 +1,35 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+
+from core.sqlite import apply_pragmas, pragma_statements
+
+
+class SqlitePragmaTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_pragmas_are_off_by_default(self):
+        """без SQLITE_TUNING соединение не меняется"""
+        before = self.pragma('cache_size')
+        apply_pragmas(sender=None, connection=connection)
+        self.assertEqual(self.pragma('cache_size'), before)
+
+    @override_settings(
+        SQLITE_TUNING=True,
+        SQLITE_PRAGMAS={'cache_size': -4096, 'busy_timeout': 1234},
+    )
+    def test_pragmas_are_applied(self):
+        """при создании соединения выполняются PRAGMA из настроек"""
+        before = self.pragma('cache_size')
+        self.addCleanup(
+            connection.connection.execute, f'PRAGMA cache_size = {before}')
+        apply_pragmas(sender=None, connection=connection)
+        self.assertEqual(self.pragma('cache_size'), -4096)
+        self.assertEqual(self.pragma('busy_timeout'), 1234)
+
+    def test_pragma_names_are_checked(self):
+        """имя PRAGMA не может содержать произвольный SQL"""
+        with self.assertRaises(ValueError):
+            list(pragma_statements({'cache_size; DROP TABLE x': 1}))
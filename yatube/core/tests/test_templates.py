@@ -0,0 +1,99 @@
+import importlib
+import os
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.metrics import registry
+
+User = get_user_model()
+
+
+class TemplateProfilingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        from posts.models import Post
+        author = User.objects.create_user('author')
+        for number in range(10):
+            Post.objects.create(text=f'Пост {number}', author=author)
+
+    def setUp(self):
+        cache.clear()
+        registry.reset()
+
+    def test_profiling_is_off_by_default(self):
+        """без профилирования шаблоны по отдельности не считаются"""
+        self.client.get(reverse('posts:index'))
+        self.assertEqual(registry.template_snapshot(), [])
+
+    @override_settings(METRICS_TEMPLATE_PROFILING=True)
+    def test_includes_are_profiled(self):
+        """время считается по каждому шаблону и include"""
+        self.client.get(reverse('posts:index'))
+        templates = dict(registry.template_snapshot())
+        self.assertEqual(templates['includes/post_card.html'][0], 10)
+        for name in ('posts/index.html', 'base/base.html',
+                     'includes/header.html'):
+            with self.subTest(template=name):
+                count, elapsed, own = templates[name]
+                self.assertEqual(count, 1)
+                self.assertLessEqual(own, elapsed)
+        self.assertIn(
+            'yatube_template_self_seconds_sum'
+            '{template="includes/post_card.html"}',
+            self.client.get(reverse('metrics')).content.decode())
+
+    def test_profile_templates_command(self):
+        """команда выводит шаблоны страницы с временем рендера"""
+        out = StringIO()
+        call_command(
+            'profile_templates', '/', requests=2, cold=True, stdout=out)
+        self.assertIn('includes/post_card.html', out.getvalue())
+        self.assertIn('10.0', out.getvalue())
+
+    @override_settings(ALLOWED_HOSTS=['yatube.example'])
+    def test_profile_templates_keeps_cache(self):
+        """без --cold кэш не очищается, Host берется из ALLOWED_HOSTS"""
+        cache.set('marker', 1)
+        call_command(
+            'profile_templates', '/', requests=2, stdout=StringIO())
+        self.assertEqual(cache.get('marker'), 1)
+
+
+class ProductionSettingsTests(TestCase):
+    def test_cached_loader(self):
+        """боевые настройки включают кэширующий загрузчик шаблонов"""
+        production = importlib.import_module('yatube.settings_production')
+        self.assertFalse(production.DEBUG)
+        loaders = production.TEMPLATES[0]['OPTIONS']['loaders']
+        self.assertEqual(
+            loaders[0][0], 'django.template.loaders.cached.Loader')
+        self.assertNotIn('loaders', settings.TEMPLATES[0]['OPTIONS'])
+
+    def test_shared_cache(self):
+        """версии кэша на боевом сервере общие, иначе кэш страниц выключен"""
+        production = importlib.import_module('yatube.settings_production')
+        self.assertEqual(
+            production.CACHES['default']['BACKEND'],
+            production.CACHE_BACKENDS['file'][0])
+        self.assertTrue(production.POSTS_CONDITIONAL_GET)
+        try:
+            with mock.patch.dict(os.environ, {'YATUBE_CACHE': 'locmem'}):
+                production = importlib.reload(production)
+            self.assertFalse(production.POSTS_CONDITIONAL_GET)
+            self.assertEqual(production.POSTS_INDEX_CACHE_TIMEOUT, 0)
+            self.assertEqual(production.POSTS_CARD_CACHE_TIMEOUT, 0)
+        finally:
+            importlib.reload(production)
+
+    def test_metrics_not_open_to_proxy(self):
+        """за прокси /_metrics не открывается по адресу 127.0.0.1"""
+        production = importlib.import_module('yatube.settings_production')
+        self.assertEqual(production.METRICS_ALLOWED_IPS, ())
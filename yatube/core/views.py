@@ -1,5 +1,10 @@
+from django.conf import settings
+from django.utils.crypto import constant_time_compare
+from django.http import Http404, HttpResponse
 from django.shortcuts import render
 
+from .metrics import registry
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +20,20 @@ def page_status_500(request):
 
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
+
+
+def metrics_allowed(request):
+    if request.user.is_staff:
+        return True
+    token = settings.METRICS_TOKEN
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if token and constant_time_compare(header, f'Bearer {token}'):
+        return True
+    return request.META.get('REMOTE_ADDR') in settings.METRICS_ALLOWED_IPS
+
+
+def metrics(request):
+    if not metrics_allowed(request):
+        raise Http404
+    return HttpResponse(
+        registry.render(), content_type='text/plain; version=0.0.4')
@@ -1,6 +1,7 @@
 from django.contrib import admin
 
 from .models import Post, Group, Comment, Follow
+from .search import get_backend, tokenize
 
 
 class PostAdmin(admin.ModelAdmin):
@@ -10,6 +11,12 @@ class PostAdmin(admin.ModelAdmin):
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        if not tokenize(search_term):
+            return super().get_search_results(
+                request, queryset, search_term)
+        return get_backend().filter(queryset, search_term), False
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
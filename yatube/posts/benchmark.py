@@ -0,0 +1,295 @@
+"""Синтетические данные и замеры страниц постов.
+
+Сидер строит граф подписок со степенным распределением: авторы
+упорядочены по «популярности», и вероятность подписаться на автора
+с рангом r пропорциональна 1 / r ** alpha. Так же распределены и посты.
+"""
+import datetime as dt
+import itertools
+import random
+import sqlite3
+import threading
+import time
+from collections import Counter
+from statistics import mean
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from faker import Faker
+
+from core.metrics import percentile
+
+from .models import Comment, Follow, Group, Post, User
+from .transfer import keep_dates
+
+USERNAME_PREFIX = 'bench'
+PASSWORD = 'benchmark'
+
+
+def power_law_weights(count, alpha):
+    return list(itertools.accumulate(
+        1 / rank ** alpha for rank in range(1, count + 1)))
+
+
+class Seeder:
+    def __init__(self, seed=0, batch_size=5000, alpha=1.2, log=None):
+        self.random = random.Random(seed)
+        self.fake = Faker('ru_RU')
+        self.fake.seed_instance(seed)
+        self.batch_size = batch_size
+        self.alpha = alpha
+        self.log = log or (lambda message: None)
+
+    def batches(self, objects):
+        iterator = iter(objects)
+        while True:
+            batch = list(itertools.islice(iterator, self.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def bulk_create(self, model, objects, **kwargs):
+        created = 0
+        for batch in self.batches(objects):
+            with transaction.atomic():
+                model.objects.bulk_create(batch, **kwargs)
+            created += len(batch)
+            self.log(f'{model.__name__}: {created}')
+        return created
+
+    def pick(self, ids, weights, k=1):
+        return self.random.choices(ids, cum_weights=weights, k=k)
+
+    def users(self, count):
+        password = make_password(PASSWORD)
+        start = User.objects.filter(
+            username__startswith=USERNAME_PREFIX).count()
+        self.bulk_create(User, (
+            User(
+                username=f'{USERNAME_PREFIX}{number}',
+                first_name=self.fake.first_name(),
+                last_name=self.fake.last_name(),
+                email=f'{USERNAME_PREFIX}{number}@example.com',
+                password=password,
+            )
+            for number in range(start, start + count)
+        ))
+        # порядок id задает ранг популярности автора
+        return list(User.objects.filter(
+            username__startswith=USERNAME_PREFIX
+        ).order_by('pk').values_list('pk', flat=True))
+
+    def groups(self, count):
+        self.bulk_create(Group, (
+            Group(
+                title=self.fake.catch_phrase()[:200],
+                slug=f'{USERNAME_PREFIX}-{number}',
+                description=self.fake.paragraph(),
+            )
+            for number in range(count)
+        ), ignore_conflicts=True)
+        return list(Group.objects.filter(
+            slug__startswith=f'{USERNAME_PREFIX}-'
+        ).values_list('pk', flat=True))
+
+    def posts(self, count, user_ids, group_ids, days=365):
+        weights = power_law_weights(len(user_ids), self.alpha)
+        now = timezone.now()
+        with keep_dates():
+            self.bulk_create(Post, (
+                Post(
+                    text=self.fake.paragraph(nb_sentences=5),
+                    author_id=self.pick(user_ids, weights)[0],
+                    group_id=(
+                        self.random.choice(group_ids)
+                        if group_ids and self.random.random() < 0.5 else None
+                    ),
+                    pub_date=now - dt.timedelta(
+                        seconds=self.random.randrange(days * 24 * 60 * 60)),
+                )
+                for _ in range(count)
+            ))
+
+    def follows(self, user_ids, max_following):
+        weights = power_law_weights(len(user_ids), self.alpha)
+
+        def follows():
+            for user_id in user_ids:
+                k = min(
+                    int(self.random.paretovariate(self.alpha)), max_following)
+                for author_id in set(self.pick(user_ids, weights, k)):
+                    if author_id != user_id:
+                        yield Follow(user_id=user_id, author_id=author_id)
+
+        self.bulk_create(Follow, follows(), ignore_conflicts=True)
+
+    def comments(self, count, user_ids):
+        post_ids = list(Post.objects.order_by(
+            '-pub_date').values_list('pk', flat=True)[:max(count // 5, 1)])
+        if not post_ids:
+            return
+        self.bulk_create(Comment, (
+            Comment(
+                post_id=self.random.choice(post_ids),
+                author_id=self.random.choice(user_ids),
+                text=self.fake.sentence(),
+            )
+            for _ in range(count)
+        ))
+
+
+def benchmark_targets(page=1):
+    """Адреса страниц для замера на самых «тяжелых» объектах базы."""
+    author = User.objects.order_by(
+        F('stats__posts_count').desc(nulls_last=True), 'pk').first()
+    reader = User.objects.order_by(
+        F('stats__following_count').desc(nulls_last=True), 'pk').first()
+    group = Group.objects.annotate(
+        posts_total=Count('posts')).order_by('-posts_total', 'pk').first()
+    post = Post.objects.annotate(
+        comments_total=Count('comments')
+    ).order_by('-comments_total', '-pk').first()
+    query = f'?page={page}' if page > 1 else ''
+    targets = {'index': (reverse('posts:index') + query, None)}
+    if group:
+        targets['group_posts'] = (reverse(
+            'posts:group_list', kwargs={'slug': group.slug}) + query, None)
+    if author:
+        targets['profile'] = (reverse(
+            'posts:profile', kwargs={'username': author.username}
+        ) + query, None)
+    if post:
+        targets['post_details'] = (reverse(
+            'posts:post_details', kwargs={'post_id': post.pk}), None)
+    if reader:
+        targets['follow_index'] = (
+            reverse('posts:follow_index') + query, reader)
+    return targets
+
+
+def measure(url, user=None, requests=50, warmup=5, cold=False):
+    """Время ответа в миллисекундах и число запросов к базе."""
+    client = Client(HTTP_HOST=settings.ALLOWED_HOSTS[0])
+    if user is not None:
+        client.force_login(user)
+    timings, queries = [], []
+    for number in range(warmup + requests):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            started = time.perf_counter()
+            response = client.get(url)
+            elapsed = (time.perf_counter() - started) * 1000
+        if response.status_code != 200:
+            raise RuntimeError(f'{url}: ответ {response.status_code}')
+        if number >= warmup:
+            timings.append(elapsed)
+            queries.append(len(captured))
+    return {
+        'url': url,
+        'requests': requests,
+        'p50_ms': round(percentile(timings, 0.5), 3),
+        'p95_ms': round(percentile(timings, 0.95), 3),
+        'mean_ms': round(mean(timings), 3),
+        'queries': max(queries),
+    }
+
+
+def run(views=None, page=1, **options):
+    return {
+        name: measure(url, user, **options)
+        for name, (url, user) in benchmark_targets(page).items()
+        if not views or name in views
+    }
+
+
+def feed_queries():
+    """SQL страницы ленты: число постов и сами посты с карточками."""
+    from .views import POSTS_ON_SCREEN
+    sql, params = Post.objects.for_feed()[
+        :POSTS_ON_SCREEN].query.sql_with_params()
+    return [
+        (f'SELECT COUNT(*) FROM {Post._meta.db_table}', ()),
+        (sql.replace('%s', '?'), params),
+    ]
+
+
+class MixedLoad:
+    """Смешанная нагрузка на копию базы: чтение ленты и комментарии.
+
+    Без reuse каждая операция открывает новое соединение, как запрос
+    при CONN_MAX_AGE = 0.
+    """
+
+    def __init__(self, path, pragmas=None, reuse=False, write_ratio=0.1):
+        from core.sqlite import pragma_statements
+        self.path = path
+        self.statements = list(pragma_statements(pragmas or {}))
+        self.reuse = reuse
+        self.write_ratio = write_ratio
+        self.reads = feed_queries()
+        self.insert = (
+            f'INSERT INTO {Comment._meta.db_table} (post_id, author_id, '
+            f'text, created) VALUES (?, ?, ?, ?)'
+        )
+        self.comment = Post.objects.values_list('pk', 'author_id').first()
+        self.totals = Counter()
+        self.lock = threading.Lock()
+
+    def connect(self):
+        db = sqlite3.connect(self.path, timeout=5)
+        for statement in self.statements:
+            db.execute(statement)
+        return db
+
+    def operation(self, db, rng):
+        if rng.random() < self.write_ratio:
+            with db:
+                db.execute(self.insert, (
+                    *self.comment, 'benchmark',
+                    timezone.now().isoformat(' ')))
+            return 'writes'
+        for sql, params in self.reads:
+            db.execute(sql, params).fetchall()
+        return 'reads'
+
+    def worker(self, number, deadline):
+        rng = random.Random(number)
+        counts = Counter()
+        shared = self.connect() if self.reuse else None
+        while time.perf_counter() < deadline:
+            db = shared or self.connect()
+            try:
+                counts[self.operation(db, rng)] += 1
+            except sqlite3.OperationalError:
+                counts['locked'] += 1
+            finally:
+                if db is not shared:
+                    db.close()
+        if shared is not None:
+            shared.close()
+        with self.lock:
+            self.totals.update(counts)
+
+    def run(self, seconds=5.0, threads=4):
+        deadline = time.perf_counter() + seconds
+        workers = [
+            threading.Thread(target=self.worker, args=(number, deadline))
+            for number in range(threads)
+        ]
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        return {
+            'reads_per_second': round(self.totals['reads'] / seconds, 1),
+            'writes_per_second': round(self.totals['writes'] / seconds, 1),
+            'locked': self.totals['locked'],
+        }
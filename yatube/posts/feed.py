@@ -0,0 +1,103 @@
+"""Лента подписок, раскладываемая по читателям при публикации поста.
+
+Посты авторов с очень большим числом подписчиков не раскладываются,
+а подмешиваются в ленту при чтении.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F, Q
+
+from .models import FeedEntry, Follow, Post, UserStats
+
+PULL_AUTHORS_KEY = 'feed:pull_authors'
+PULL_AUTHORS_TIMEOUT = 5 * 60
+BATCH_SIZE = 500
+
+
+def is_enabled():
+    return settings.POSTS_FEED_FANOUT
+
+
+def pull_author_ids():
+    """Авторы, чьи посты не раскладываются по лентам, а читаются на лету."""
+    author_ids = cache.get(PULL_AUTHORS_KEY)
+    if author_ids is None:
+        author_ids = set(
+            UserStats.objects.filter(
+                followers_count__gt=settings.POSTS_FEED_PULL_THRESHOLD
+            ).values_list('user', flat=True)
+        )
+        cache.set(PULL_AUTHORS_KEY, author_ids, PULL_AUTHORS_TIMEOUT)
+    return author_ids
+
+
+def _entries(user_ids, posts):
+    return [
+        FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in user_ids
+        for post in posts
+    ]
+
+
+def fan_out(post):
+    if not is_enabled() or post.author_id in pull_author_ids():
+        return
+    follower_ids = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user', flat=True)
+    FeedEntry.objects.bulk_create(
+        _entries(follower_ids.iterator(), [post]),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user, author):
+    if not is_enabled() or author.pk in pull_author_ids():
+        return
+    posts = author.posts.only('id', 'pub_date')[
+        :settings.POSTS_FEED_BACKFILL
+    ]
+    FeedEntry.objects.bulk_create(
+        _entries([user.pk], posts),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+
+
+def trim(user, author):
+    if is_enabled():
+        FeedEntry.objects.filter(user=user, post__author=author).delete()
+
+
+def rebuild(user):
+    FeedEntry.objects.filter(user=user).delete()
+    for follow in Follow.objects.filter(user=user).select_related('author'):
+        backfill(user, follow.author)
+
+
+def follow_feed(user):
+    """Посты ленты по убыванию feed_date.
+
+    Разложенная лента читается диапазоном индекса (user, -pub_date)
+    записей FeedEntry. Если читатель подписан на авторов, чьи посты
+    подмешиваются на лету, — общим запросом по постам.
+    """
+    if not is_enabled():
+        posts = Post.objects.filter(author__following__user=user).annotate(
+            feed_date=F('pub_date'))
+        return posts.order_by('-feed_date', '-pk')
+    pull_authors = pull_author_ids()
+    if pull_authors:
+        pull_authors = set(Follow.objects.filter(
+            user=user, author__in=pull_authors
+        ).values_list('author', flat=True))
+    if not pull_authors:
+        posts = Post.objects.filter(feed_entries__user=user).annotate(
+            feed_date=F('feed_entries__pub_date'))
+        return posts.order_by('-feed_date', '-pk')
+    posts = Post.objects.filter(
+        Q(pk__in=FeedEntry.objects.filter(user=user).values('post'))
+        | Q(author__in=pull_authors)
+    ).annotate(feed_date=F('pub_date'))
+    return posts.order_by('-feed_date', '-pk')
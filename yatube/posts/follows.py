@@ -0,0 +1,72 @@
+"""Подписка и отписка сразу на многих авторов.
+
+Массовые операции не посылают сигналы, поэтому счетчики, ленты,
+популярное и версии страниц обновляются здесь же, пачками.
+"""
+from django.db import connections, router
+
+from . import feed, stats, trending
+from .models import FeedEntry, Follow
+from .versions import bump_version, user_scope
+
+
+def _bump_versions(user, author_ids):
+    for author_id in (user.pk, *author_ids):
+        bump_version(user_scope(author_id))
+
+
+def _delete_follows(user, author_ids):
+    """Один DELETE без сигналов: счетчики уменьшаются пачкой."""
+    connection = connections[router.db_for_write(Follow)]
+    table, user_column, author_column = (
+        connection.ops.quote_name(name) for name in (
+            Follow._meta.db_table,
+            Follow._meta.get_field('user').column,
+            Follow._meta.get_field('author').column,
+        )
+    )
+    placeholders = ', '.join(['%s'] * len(author_ids))
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {table} WHERE {user_column} = %s '
+            f'AND {author_column} IN ({placeholders})',
+            [user.pk, *author_ids],
+        )
+
+
+def follow_many(user, authors):
+    """Подписывает на авторов и возвращает id новых подписок."""
+    existing = set(Follow.objects.filter(
+        user=user, author__in=authors
+    ).values_list('author', flat=True))
+    new = [author for author in authors if author.pk not in existing]
+    if not new:
+        return set()
+    Follow.objects.bulk_create(
+        [Follow(user=user, author=author) for author in new],
+        ignore_conflicts=True,
+    )
+    new_ids = {author.pk for author in new}
+    stats.increment(user.pk, 'following_count', len(new_ids))
+    stats.increment_many(new_ids, 'followers_count')
+    for author in new:
+        feed.backfill(user, author)
+    trending.record_follows(new_ids)
+    _bump_versions(user, new_ids)
+    return new_ids
+
+
+def unfollow_many(user, authors):
+    """Отписывает от авторов и возвращает id удаленных подписок."""
+    follows = Follow.objects.filter(user=user, author__in=authors)
+    removed = set(follows.values_list('author', flat=True))
+    if not removed:
+        return set()
+    _delete_follows(user, removed)
+    stats.increment(user.pk, 'following_count', -len(removed))
+    stats.increment_many(removed, 'followers_count', -1)
+    if feed.is_enabled():
+        FeedEntry.objects.filter(
+            user=user, post__author__in=removed).delete()
+    _bump_versions(user, removed)
+    return removed
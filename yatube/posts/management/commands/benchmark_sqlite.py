@@ -0,0 +1,57 @@
+import json
+import os
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from posts.benchmark import MixedLoad
+from posts.models import Post
+
+PROFILES = (
+    # как в settings.py: журнал DELETE, новое соединение на каждый запрос
+    ('default', {'journal_mode': 'DELETE', 'synchronous': 'FULL'}, False),
+    ('tuned', settings.SQLITE_PRAGMAS, True),
+)
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает пропускную способность SQLite до и после настройки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.1,
+            help='Доля операций записи'
+        )
+        parser.add_argument('--output', help='Куда записать результат JSON')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Замер имеет смысл только для SQLite')
+        if not Post.objects.exists():
+            raise CommandError('В базе нет постов: выполните seed_benchmark')
+        connection.ensure_connection()
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for name, pragmas, reuse in PROFILES:
+                # каждый профиль получает свежую копию базы
+                path = os.path.join(directory, f'{name}.sqlite3')
+                target = sqlite3.connect(path)
+                try:
+                    connection.connection.backup(target)
+                finally:
+                    target.close()
+                load = MixedLoad(path, pragmas, reuse, options['write_ratio'])
+                result = results[name] = load.run(
+                    options['seconds'], options['threads'])
+                self.stdout.write(
+                    f'{name:<8} чтений/с {result["reads_per_second"]:>9}'
+                    f'  записей/с {result["writes_per_second"]:>8}'
+                    f'  блокировок {result["locked"]:>5}')
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(results, stream, ensure_ascii=False, indent=2)
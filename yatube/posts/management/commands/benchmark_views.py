@@ -0,0 +1,83 @@
+import json
+import platform
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from posts import benchmark
+
+VIEWS = ('index', 'group_posts', 'profile', 'post_details', 'follow_index')
+FLAGS = (
+    'DEBUG', 'POSTS_CURSOR_PAGINATION', 'POSTS_FEED_FANOUT',
+    'POSTS_INDEX_CACHE_TIMEOUT', 'POSTS_CARD_CACHE_TIMEOUT',
+)
+
+
+class Command(BaseCommand):
+    help = 'Замеряет p50/p95 и число запросов у страниц постов'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'views', nargs='*',
+            help=f'Какие страницы замерять: {", ".join(VIEWS)} '
+                 f'(по умолчанию все)'
+        )
+        parser.add_argument('--requests', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--page', type=int, default=1)
+        parser.add_argument(
+            '--cold', action='store_true',
+            help='Очищать кэш перед каждым запросом'
+        )
+        parser.add_argument('--output', help='Куда записать результат JSON')
+        parser.add_argument(
+            '--compare', help='JSON прошлого прогона для сравнения')
+
+    def handle(self, *args, **options):
+        unknown = set(options['views']) - set(VIEWS)
+        if unknown:
+            raise CommandError(f'Неизвестные страницы: {", ".join(unknown)}')
+        results = benchmark.run(
+            options['views'], options['page'],
+            requests=options['requests'], warmup=options['warmup'],
+            cold=options['cold'],
+        )
+        report = {
+            'created': timezone.now().isoformat(),
+            'python': platform.python_version(),
+            'database': connection.vendor,
+            'settings': {flag: getattr(settings, flag) for flag in FLAGS},
+            'options': {
+                key: options[key]
+                for key in ('requests', 'warmup', 'page', 'cold')
+            },
+            'views': results,
+        }
+        baseline = self.load_baseline(options['compare'])
+        for name, result in results.items():
+            line = (
+                f'{name:<14} p50 {result["p50_ms"]:>9.2f} ms  '
+                f'p95 {result["p95_ms"]:>9.2f} ms  '
+                f'запросов {result["queries"]:>3}'
+            )
+            before = baseline.get(name)
+            if before:
+                line += (
+                    f'  (p50 {result["p50_ms"] - before["p50_ms"]:+.2f} ms, '
+                    f'запросов {result["queries"] - before["queries"]:+d})'
+                )
+            self.stdout.write(line)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as stream:
+                json.dump(report, stream, ensure_ascii=False, indent=2)
+
+    def load_baseline(self, path):
+        if not path:
+            return {}
+        try:
+            with open(path, encoding='utf-8') as stream:
+                return json.load(stream)['views']
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
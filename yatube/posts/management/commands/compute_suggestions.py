@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import suggestions
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рекомендации авторов для подписки'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        computed = suggestions.compute(batch_size=options['batch_size'])
+        self.stdout.write(f'Рекомендации рассчитаны для {computed} польз.')
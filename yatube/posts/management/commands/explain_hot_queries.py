@@ -0,0 +1,50 @@
+import timeit
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from posts.models import Comment, Follow, Post, User
+
+
+class Command(BaseCommand):
+    help = ('Показывает план выполнения и время самых частых запросов; '
+            'запустите до и после миграции индексов, чтобы сравнить')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=100)
+
+    def hot_queries(self):
+        user = User.objects.order_by('?').first()
+        author = (User.objects.filter(posts__isnull=False)
+                  .order_by('?').first()) or user
+        post = Post.objects.order_by('?').first()
+        return {
+            'profile: подписка': Follow.objects.filter(
+                user=user, author=author)[:1],
+            'profile: посты автора': Post.objects.filter(author=author)[:10],
+            'group_posts: посты группы': Post.objects.filter(
+                group_id=post and post.group_id)[:10],
+            'post_details: комментарии': Comment.objects.filter(
+                post=post)[:10],
+        }
+
+    def explain(self, queryset):
+        sql, params = queryset.query.sql_with_params()
+        prefix = ('EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite'
+                  else 'EXPLAIN')
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            return [' '.join(map(str, row)) for row in cursor.fetchall()]
+
+    def handle(self, *args, **options):
+        if not User.objects.exists():
+            self.stdout.write('База пуста, сначала заполните ее данными')
+            return
+        for name, queryset in self.hot_queries().items():
+            seconds = timeit.timeit(
+                lambda: list(queryset.all()), number=options['repeat'])
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            for line in self.explain(queryset):
+                self.stdout.write(f'  {line}')
+            self.stdout.write(
+                f'  {seconds / options["repeat"] * 1000:.3f} мс на запрос')
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    help = 'Выгружает пользователей, посты, комментарии и подписки в NDJSON'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default='-',
+            help='Файл для выгрузки (по умолчанию stdout)'
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        if options['path'] == '-':
+            written = transfer.export(self.stdout, options['batch_size'])
+        else:
+            with open(options['path'], 'w', encoding='utf-8') as stream:
+                written = transfer.export(stream, options['batch_size'])
+        summary = ', '.join(
+            f'{key}: {value}' for key, value in written.items())
+        self.stderr.write(f'Выгружено записей — {summary}')
@@ -0,0 +1,36 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.transfer import Importer, rebuild_derived
+
+
+class Command(BaseCommand):
+    help = 'Загружает данные из NDJSON, выгруженного export_yatube'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', help='Файл с данными или - для чтения из stdin')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--skip-rebuild', action='store_true',
+            help='Не пересчитывать счетчики, поиск и ленты после загрузки'
+        )
+
+    def handle(self, *args, **options):
+        importer = Importer(options['batch_size'])
+        try:
+            if options['path'] == '-':
+                loaded = importer.load(sys.stdin)
+            else:
+                with open(options['path'], encoding='utf-8') as stream:
+                    loaded = importer.load(stream)
+        except ValueError as error:
+            raise CommandError(error)
+        summary = ', '.join(
+            f'{key}: {value}' for key, value in loaded.items())
+        self.stdout.write(f'Загружено записей — {summary}')
+        if options['skip_rebuild']:
+            return
+        rebuild_derived(options['batch_size'])
+        self.stdout.write('Счетчики, поиск и ленты пересобраны')
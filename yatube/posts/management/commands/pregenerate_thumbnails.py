@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = 'Готовит миниатюры и варианты картинок для всех постов'
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').only('image', 'image_variants')
+        done = 0
+        for post in posts.iterator():
+            thumbnails.generate(post)
+            done += 1
+        self.stdout.write(f'Обработано картинок: {done}')
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.search import get_backend
+
+
+class Command(BaseCommand):
+    help = 'Перестраивает поисковый индекс постов'
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        with transaction.atomic():
+            backend.rebuild()
+        self.stdout.write(
+            f'Индекс перестроен: {backend.__class__.__name__}')
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from posts import trending
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает рейтинг популярных постов и сообществ'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        trending.rebuild(options['batch_size'])
+        self.stdout.write('Рейтинг популярного пересчитан')
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts import stats
+from posts.models import UserStats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счетчики постов, подписок и комментариев'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            stats.rebuild_all(options['batch_size'])
+        self.stdout.write(
+            f'Пересчитано пользователей: {UserStats.objects.count()}')
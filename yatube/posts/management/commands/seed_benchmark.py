@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand
+
+from posts.benchmark import PASSWORD, Seeder
+from posts.transfer import rebuild_derived
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими пользователями, постами и подписками'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--posts', type=int, default=1_000_000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--comments', type=int, default=200_000)
+        parser.add_argument(
+            '--max-following', type=int, default=1000,
+            help='Максимум подписок у одного пользователя'
+        )
+        parser.add_argument(
+            '--alpha', type=float, default=1.2,
+            help='Показатель степенного распределения подписок и постов'
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        log = self.stdout.write if options['verbosity'] > 1 else None
+        seeder = Seeder(
+            options['seed'], options['batch_size'], options['alpha'], log)
+        user_ids = seeder.users(options['users'])
+        group_ids = seeder.groups(options['groups'])
+        seeder.posts(options['posts'], user_ids, group_ids)
+        seeder.follows(user_ids, options['max_following'])
+        seeder.comments(options['comments'], user_ids)
+        rebuild_derived(options['batch_size'])
+        self.stdout.write(
+            f'Пользователей: {len(user_ids)}, пароль «{PASSWORD}»')
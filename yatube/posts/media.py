@@ -0,0 +1,22 @@
+"""Освобождение файлов картинки, на которую больше не ссылается ни один пост.
+
+Ссылки считаются по колонке Post.image: при дедупликации одна картинка
+вместе с миниатюрами и вариантами может принадлежать нескольким постам.
+"""
+from django.conf import settings
+from sorl.thumbnail import delete as delete_thumbnails
+
+from . import variants
+from .models import Post
+
+
+def is_shared(image_name, post_pk):
+    return Post.objects.filter(image=image_name).exclude(pk=post_pk).exists()
+
+
+def release(post_pk, image, manifest):
+    if not image or is_shared(image.name, post_pk):
+        return
+    if manifest:
+        variants.delete(variants.parse_manifest(manifest), image.storage)
+    delete_thumbnails(image, delete_file=settings.POSTS_DEDUPLICATE_MEDIA)
@@ -0,0 +1,48 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:44
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def remove_duplicate_follows(apps, schema_editor):
+    Follow = apps.get_model('posts', 'Follow')
+    duplicates = Follow.objects.values('user', 'author').annotate(
+        first_id=Min('id'), total=Count('id')
+    ).filter(total__gt=1)
+    for duplicate in duplicates:
+        Follow.objects.filter(
+            user=duplicate['user'], author=duplicate['author']
+        ).exclude(id=duplicate['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_userstats'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='follow',
+            options={'verbose_name': 'Подписка', 'verbose_name_plural': 'Подписки'},
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['post', '-created'], name='comment_post_created'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', '-pub_date'], name='post_author_date'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', '-pub_date'], name='post_group_date'),
+        ),
+        migrations.RunPython(
+            remove_duplicate_follows, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('user', 'author'), name='unique_follow'),
+        ),
+    ]
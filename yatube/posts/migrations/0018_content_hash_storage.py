@@ -0,0 +1,19 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:53
+
+from django.db import migrations, models
+import posts.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0017_post_image_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, db_index=True, storage=posts.storage.ContentHashStorage(), upload_to='posts/', verbose_name='Картинка'),
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 2.2.16 on 2026-10-18 18:54
+
+import re
+from collections import Counter
+
+from django.db import migrations, models
+from django.db.utils import OperationalError
+import django.db.models.deletion
+
+FTS_TABLE = 'posts_post_fts'
+# копия posts.search.tokenize на момент миграции: живые модули не импортируются
+WORD_RE = re.compile(r'\w+')
+MAX_TERM_LENGTH = 64
+
+
+def tokenize(text):
+    return [
+        word[:MAX_TERM_LENGTH] for word in WORD_RE.findall(text.lower())
+    ]
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor == 'sqlite':
+        with connection.cursor() as cursor:
+            try:
+                cursor.execute(
+                    f'CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(text)')
+            except OperationalError:
+                pass
+            else:
+                cursor.execute(
+                    f'INSERT INTO {FTS_TABLE}(rowid, text) '
+                    f'SELECT id, text FROM posts_post'
+                )
+                return
+    Post = apps.get_model('posts', 'Post')
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    for post in Post.objects.only('text').iterator():
+        SearchTerm.objects.bulk_create(
+            SearchTerm(term=term, post_id=post.pk, weight=weight)
+            for term, weight in Counter(tokenize(post.text)).items()
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0018_content_hash_storage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Слово')),
+                ('weight', models.PositiveIntegerField(default=1, verbose_name='Вес')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post', verbose_name='Пост')),
+            ],
+            options={
+                'verbose_name': 'Слово поискового индекса',
+                'verbose_name_plural': 'Поисковый индекс',
+                'unique_together': {('term', 'post')},
+            },
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:14
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0019_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Suggestions',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='suggestions', serialize=False, to=settings.AUTH_USER_MODEL, verbose_name='Пользователь')),
+                ('usernames', models.TextField(blank=True, verbose_name='Авторы')),
+                ('computed', models.DateTimeField(auto_now=True, verbose_name='Рассчитано')),
+            ],
+            options={
+                'verbose_name': 'Рекомендации авторов',
+                'verbose_name_plural': 'Рекомендации авторов',
+            },
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0020_suggestions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingGroup',
+            fields=[
+                ('group', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='posts.Group', verbose_name='Сообщество')),
+                ('score', models.FloatField(db_index=True, verbose_name='Рейтинг')),
+            ],
+            options={
+                'verbose_name': 'Популярное сообщество',
+                'verbose_name_plural': 'Популярные сообщества',
+            },
+        ),
+        migrations.CreateModel(
+            name='TrendingPost',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='posts.Post', verbose_name='Пост')),
+                ('score', models.FloatField(db_index=True, verbose_name='Рейтинг')),
+            ],
+            options={
+                'verbose_name': 'Популярный пост',
+                'verbose_name_plural': 'Популярные посты',
+            },
+        ),
+    ]
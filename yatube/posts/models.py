@@ -1,6 +1,10 @@
 from django.db import models
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
 
+from .storage import ContentHashStorage
+
 User = get_user_model()
 CHARS_IN_STR = 15
 
@@ -18,6 +22,27 @@ class Group(models.Model):
         verbose_name_plural = 'Сообщества'
 
 
+def comment_count(post_ref):
+    """Число комментариев коррелированным подзапросом.
+
+    JOIN с GROUP BY по всем постам не дает взять страницу по индексу
+    pub_date, а подзапрос считается только для постов из LIMIT.
+    """
+    comments = Comment.objects.filter(post=OuterRef(post_ref)).order_by(
+    ).values('post').annotate(total=Count('pk')).values('total')
+    return Coalesce(Subquery(comments, output_field=IntegerField()), 0)
+
+
+class PostQuerySet(models.QuerySet):
+    def for_feed(self):
+        """Посты со всем, что нужно карточке, без запросов на каждый пост."""
+        return self.select_related('author', 'group').only(
+            'text', 'pub_date', 'image', 'image_variants',
+            'author__username', 'author__first_name', 'author__last_name',
+            'group__slug', 'group__title',
+        ).annotate(comment_count=comment_count('pk'))
+
+
 class Post(models.Model):
     text = models.TextField('Текст', help_text='Введите текст поста')
     pub_date = models.DateTimeField(
@@ -43,9 +68,18 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
-        blank=True
+        storage=ContentHashStorage(),
+        blank=True,
+        db_index=True
+    )
+    image_variants = models.TextField(
+        'Варианты картинки',
+        blank=True,
+        editable=False
     )
 
+    objects = PostQuerySet.as_manager()
+
     def __str__(self):
         return self.text[:CHARS_IN_STR]
 
@@ -53,6 +87,12 @@ class Post(models.Model):
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(fields=['author', '-pub_date'],
+                         name='post_author_date'),
+            models.Index(fields=['group', '-pub_date'],
+                         name='post_group_date'),
+        ]
 
 
 class Comment(models.Model):
@@ -78,6 +118,10 @@ class Comment(models.Model):
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
         ordering = ('-created',)
+        indexes = [
+            models.Index(fields=['post', '-created'],
+                         name='comment_post_created'),
+        ]
 
 
 class Follow(models.Model):
@@ -93,3 +137,116 @@ class Follow(models.Model):
         related_name='following',
         verbose_name='Автор'
     )
+
+    class Meta:
+        verbose_name = 'Подписка'
+        verbose_name_plural = 'Подписки'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'author'], name='unique_follow'
+            ),
+        ]
+
+
+class FeedEntry(models.Model):
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+        verbose_name='Читатель'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField('Дата')
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', '-pub_date'], name='feed_user_date'),
+        ]
+
+
+class UserStats(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Пользователь'
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+
+class SearchTerm(models.Model):
+    term = models.CharField('Слово', max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+        verbose_name='Пост'
+    )
+    weight = models.PositiveIntegerField('Вес', default=1)
+
+    class Meta:
+        verbose_name = 'Слово поискового индекса'
+        verbose_name_plural = 'Поисковый индекс'
+        unique_together = ('term', 'post')
+
+
+class Suggestions(models.Model):
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='suggestions',
+        verbose_name='Пользователь'
+    )
+    usernames = models.TextField('Авторы', blank=True)
+    computed = models.DateTimeField('Рассчитано', auto_now=True)
+
+    class Meta:
+        verbose_name = 'Рекомендации авторов'
+        verbose_name_plural = 'Рекомендации авторов'
+
+
+class TrendingPost(models.Model):
+    post = models.OneToOneField(
+        Post,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Пост'
+    )
+    score = models.FloatField('Рейтинг', db_index=True)
+
+    class Meta:
+        verbose_name = 'Популярный пост'
+        verbose_name_plural = 'Популярные посты'
+
+
+class TrendingGroup(models.Model):
+    group = models.OneToOneField(
+        Group,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='trending',
+        verbose_name='Сообщество'
+    )
+    score = models.FloatField('Рейтинг', db_index=True)
+
+    class Meta:
+        verbose_name = 'Популярное сообщество'
+        verbose_name_plural = 'Популярные сообщества'
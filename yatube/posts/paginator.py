@@ -0,0 +1,123 @@
+import base64
+import binascii
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+CURSOR_SEPARATOR = '|'
+
+
+def encode_cursor(value, pk):
+    raw = f'{value.isoformat()}{CURSOR_SEPARATOR}{pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает пару (значение, pk) или None для битого курсора."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        value, pk = raw.decode().split(CURSOR_SEPARATOR)
+        value = parse_datetime(value)
+        pk = int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if value is None:
+        return None
+    return value, pk
+
+
+def keyset_filter(queryset, field, position, newer=False):
+    """Фильтрует queryset по позиции курсора без OFFSET.
+
+    По умолчанию возвращает записи старше позиции в порядке убывания,
+    с newer=True — записи новее позиции в порядке возрастания.
+    """
+    value, pk = position
+    lookup = 'gt' if newer else 'lt'
+    queryset = queryset.filter(
+        Q(**{f'{field}__{lookup}': value})
+        | Q(**{field: value, f'pk__{lookup}': pk})
+    )
+    if newer:
+        return queryset.order_by(field, 'pk')
+    return queryset.order_by(f'-{field}', '-pk')
+
+
+class CursorPage(Page):
+    """Страница с курсорами соседних страниц; позиции — пары (field, pk)."""
+
+    def __init__(self, object_list, paginator, next_position=None,
+                 previous_position=None):
+        super().__init__(object_list, None, paginator)
+        self.next_position = next_position
+        self.previous_position = previous_position
+
+    def has_next(self):
+        return self.next_position is not None
+
+    def has_previous(self):
+        return self.previous_position is not None
+
+    @property
+    def next_cursor(self):
+        return self.next_position and encode_cursor(*self.next_position)
+
+    @property
+    def previous_cursor(self):
+        return self.previous_position and encode_cursor(
+            *self.previous_position)
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу (field, pk) без COUNT(*) и OFFSET.
+
+    Курсор может указывать на удаленную запись или край ленты, поэтому
+    наличие соседних страниц проверяется по тому, что есть в базе.
+    """
+    is_cursor = True
+
+    def __init__(self, object_list, per_page, field='pub_date'):
+        super().__init__(object_list, per_page)
+        self.field = field
+
+    def position(self, obj):
+        return getattr(obj, self.field), obj.pk
+
+    def beyond(self, position, newer=False):
+        """Позиция, если за ней в нужную сторону еще есть записи."""
+        if keyset_filter(
+                self.object_list, self.field, position, newer).exists():
+            return position
+        return None
+
+    def get_page(self, after=None, before=None):
+        after = after and decode_cursor(after)
+        before = before and decode_cursor(before)
+        limit = self.per_page + 1
+        if before:
+            rows = list(keyset_filter(
+                self.object_list, self.field, before, newer=True
+            )[:limit])
+            previous = None
+            if len(rows) > self.per_page:
+                previous = self.position(rows[self.per_page - 1])
+            rows = rows[:self.per_page][::-1]
+            edge = self.position(rows[-1]) if rows else before
+            return CursorPage(rows, self, self.beyond(edge), previous)
+        queryset = self.object_list.order_by(f'-{self.field}', '-pk')
+        if after:
+            queryset = keyset_filter(self.object_list, self.field, after)
+        rows = list(queryset[:limit])
+        following = None
+        if len(rows) > self.per_page:
+            following = self.position(rows[self.per_page - 1])
+        rows = rows[:self.per_page]
+        previous = None
+        if after:
+            edge = self.position(rows[0]) if rows else after
+            previous = self.beyond(edge, newer=True)
+        return CursorPage(rows, self, following, previous)
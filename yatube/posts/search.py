@@ -0,0 +1,167 @@
+"""Полнотекстовый поиск по постам.
+
+На SQLite с FTS5 используется виртуальная таблица posts_post_fts,
+на остальных базах — обратный индекс в модели SearchTerm. Оба индекса
+обновляются сигналами сохранения и удаления постов.
+"""
+import re
+from collections import Counter
+
+from django.db import connection
+from django.db.models import Count, Sum
+from django.db.models.expressions import RawSQL
+
+from .models import Post, SearchTerm
+
+FTS_TABLE = 'posts_post_fts'
+MAX_TERM_LENGTH = SearchTerm._meta.get_field('term').max_length
+WORD_RE = re.compile(r'\w+')
+
+
+def tokenize(text):
+    return [
+        word[:MAX_TERM_LENGTH] for word in WORD_RE.findall(text.lower())
+    ]
+
+
+class FtsBackend:
+    """Индекс SQLite FTS5 с ранжированием по bm25."""
+
+    @staticmethod
+    def match_expression(query):
+        return ' '.join(f'"{word}"*' for word in tokenize(query))
+
+    def index(self, post):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, text) VALUES (%s, %s)',
+                [post.pk, post.text]
+            )
+
+    def remove(self, post_id):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE}(rowid, text) '
+                f'SELECT id, text FROM {Post._meta.db_table}'
+            )
+
+    def count(self, query):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s',
+                [self.match_expression(query)]
+            )
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, query, offset, limit):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+                f'ORDER BY bm25({FTS_TABLE}), rowid DESC LIMIT %s OFFSET %s',
+                [self.match_expression(query), limit, offset]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def filter(self, queryset, query):
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [self.match_expression(query)]
+        ))
+
+
+class InvertedIndexBackend:
+    """Обратный индекс на обычных таблицах: слово → посты с весом."""
+
+    def index(self, post):
+        self.remove(post.pk)
+        SearchTerm.objects.bulk_create(
+            SearchTerm(term=term, post_id=post.pk, weight=weight)
+            for term, weight in Counter(tokenize(post.text)).items()
+        )
+
+    def remove(self, post_id):
+        SearchTerm.objects.filter(post_id=post_id).delete()
+
+    def rebuild(self, batch_size=1000):
+        SearchTerm.objects.all().delete()
+        for post in Post.objects.only('text').iterator(chunk_size=batch_size):
+            self.index(post)
+
+    def matches(self, query):
+        terms = set(tokenize(query))
+        return SearchTerm.objects.filter(term__in=terms).values(
+            'post'
+        ).annotate(
+            matched=Count('term'), score=Sum('weight')
+        ).filter(matched=len(terms))
+
+    def count(self, query):
+        return self.matches(query).count()
+
+    def ranked_ids(self, query, offset, limit):
+        return list(self.matches(query).order_by(
+            '-score', '-post'
+        ).values_list('post', flat=True)[offset:offset + limit])
+
+    def filter(self, queryset, query):
+        return queryset.filter(pk__in=self.matches(query).values('post'))
+
+
+_backend = None
+
+
+def fts_available():
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+            [FTS_TABLE]
+        )
+        return cursor.fetchone() is not None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = FtsBackend() if fts_available() else InvertedIndexBackend()
+    return _backend
+
+
+class SearchResults:
+    """Ленивая выдача поиска, которую можно отдать в Paginator."""
+
+    def __init__(self, query):
+        self.query = query
+        self.backend = get_backend()
+
+    def count(self):
+        if not tokenize(self.query):
+            return 0
+        return self.backend.count(self.query)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        if not tokenize(self.query):
+            return []
+        ids = self.backend.ranked_ids(
+            self.query, key.start or 0, key.stop - (key.start or 0))
+        posts = Post.objects.for_feed().in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+
+def search_posts(query):
+    return SearchResults(query)
@@ -0,0 +1,106 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import feed, media, stats, trending
+from .models import Comment, Follow, Group, Post
+from .search import get_backend
+from .versions import (
+    INDEX_SCOPE, bump_version, group_scope, post_scope, user_scope
+)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def count_created(sender, instance, created, **kwargs):
+    if created:
+        field = 'posts_count' if sender is Post else 'comments_count'
+        stats.increment(instance.author_id, field)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+def count_deleted(sender, instance, **kwargs):
+    field = 'posts_count' if sender is Post else 'comments_count'
+    stats.increment(instance.author_id, field, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_follow(sender, instance, created, **kwargs):
+    if created:
+        stats.increment(instance.author_id, 'followers_count')
+        stats.increment(instance.user_id, 'following_count')
+
+
+@receiver(post_delete, sender=Follow)
+def count_unfollow(sender, instance, **kwargs):
+    stats.increment(instance.author_id, 'followers_count', -1)
+    stats.increment(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def bump_post_version(sender, instance, **kwargs):
+    bump_version(INDEX_SCOPE)
+    bump_version(post_scope(instance.pk))
+    bump_version(user_scope(instance.author_id))
+    if instance.group_id:
+        bump_version(group_scope(instance.group_id))
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def bump_follow_versions(sender, instance, **kwargs):
+    bump_version(user_scope(instance.author_id))
+    bump_version(user_scope(instance.user_id))
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def bump_group_version(sender, instance, **kwargs):
+    bump_version(INDEX_SCOPE)
+    bump_version(group_scope(instance.pk))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def bump_commented_post_version(sender, instance, **kwargs):
+    # на карточках главной страницы выводится число комментариев
+    bump_version(INDEX_SCOPE)
+    bump_version(post_scope(instance.post_id))
+
+
+@receiver(post_delete, sender=Post)
+def release_image(sender, instance, **kwargs):
+    media.release(instance.pk, instance.image, instance.image_variants)
+
+
+@receiver(post_save, sender=Post)
+def index_post(sender, instance, **kwargs):
+    get_backend().index(instance)
+
+
+@receiver(post_delete, sender=Post)
+def unindex_post(sender, instance, **kwargs):
+    get_backend().remove(instance.pk)
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    if created:
+        feed.fan_out(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def score_trending(sender, instance, created, **kwargs):
+    if created:
+        if sender is Post:
+            trending.record_post(instance)
+        else:
+            trending.record_comment(instance)
+
+
+@receiver(post_save, sender=Follow)
+def score_trending_follow(sender, instance, created, **kwargs):
+    if created:
+        trending.record_follows([instance.author_id])
@@ -0,0 +1,78 @@
+"""Счетчики пользователя, которые поддерживаются сигналами."""
+from django.db.models import Count, F
+
+from .models import Comment, Follow, Post, User, UserStats
+
+COUNTERS = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+    'comments_count': (Comment, 'author'),
+}
+
+
+def count_for(user_id):
+    return {
+        field: model.objects.filter(**{owner: user_id}).count()
+        for field, (model, owner) in COUNTERS.items()
+    }
+
+
+def rebuild(user_id):
+    stats, _ = UserStats.objects.update_or_create(
+        user_id=user_id, defaults=count_for(user_id)
+    )
+    return stats
+
+
+def rebuild_all(batch_size=1000):
+    counts = {
+        field: dict(
+            model.objects.order_by().values_list(owner).annotate(Count('pk'))
+        )
+        for field, (model, owner) in COUNTERS.items()
+    }
+    UserStats.objects.all().delete()
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=user_id, **{
+                field: values.get(user_id, 0)
+                for field, values in counts.items()
+            })
+            for user_id in User.objects.values_list('id', flat=True)
+        ),
+        batch_size=batch_size,
+    )
+
+
+def get_stats(user):
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return rebuild(user.pk)
+
+
+def increment(user_id, field, delta=1):
+    stats = UserStats.objects.filter(user_id=user_id)
+    if delta < 0:
+        # при удалении строку не создаем: пользователь может удаляться сам
+        stats.filter(**{f'{field}__gte': -delta}).update(
+            **{field: F(field) + delta})
+    elif not stats.update(**{field: F(field) + delta}):
+        rebuild(user_id)
+
+
+def increment_many(user_ids, field, delta=1):
+    """increment для многих пользователей одним UPDATE."""
+    user_ids = set(user_ids)
+    if not user_ids:
+        return
+    stats = UserStats.objects.filter(user_id__in=user_ids)
+    if delta < 0:
+        stats.filter(**{f'{field}__gte': -delta}).update(
+            **{field: F(field) + delta})
+        return
+    missing = user_ids - set(stats.values_list('user', flat=True))
+    stats.update(**{field: F(field) + delta})
+    for user_id in missing:
+        rebuild(user_id)
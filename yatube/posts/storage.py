@@ -0,0 +1,34 @@
+import hashlib
+import os
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentHashStorage(FileSystemStorage):
+    """Хранилище, в котором одинаковые файлы сохраняются один раз.
+
+    С POSTS_DEDUPLICATE_MEDIA имя файла строится из sha256 содержимого,
+    и повторная загрузка тех же байтов возвращает уже сохраненный файл.
+    """
+
+    def hashed_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        checksum = digest.hexdigest()
+        return os.path.join(directory, checksum[:2], checksum + extension)
+
+    def save(self, name, content, max_length=None):
+        if not settings.POSTS_DEDUPLICATE_MEDIA:
+            return super().save(name, content, max_length)
+        name = self.hashed_name(name or content.name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
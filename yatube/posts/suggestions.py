@@ -0,0 +1,121 @@
+"""Рекомендации «на кого подписаться».
+
+Считаются пакетно командой compute_suggestions по графу подписок:
+сначала авторы, на которых подписаны те, на кого подписан пользователь,
+затем популярные авторы сообществ, где он публикуется, и в конце просто
+самые популярные авторы. Страницы читают готовый список и убирают
+из него авторов, на которых пользователь подписался после расчета.
+"""
+import heapq
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+
+from .models import Follow, Post, Suggestions, User, UserStats
+from .versions import bump_version
+
+SUGGESTIONS_SCOPE = 'posts:suggestions'
+SEPARATOR = ' '
+GROUP_AUTHORS = 20
+# вес пути «друг друга» против попадания в популярных авторов сообщества
+FRIEND_WEIGHT = 10
+GROUP_WEIGHT = 1
+
+
+class Graph:
+    """Граф подписок и сообществ в памяти, загруженный за пару запросов."""
+
+    def __init__(self):
+        self.following = defaultdict(set)
+        for user_id, author_id in Follow.objects.values_list(
+                'user', 'author').iterator(chunk_size=10000):
+            self.following[user_id].add(author_id)
+        self.groups = defaultdict(set)
+        group_posts = Counter()
+        for author_id, group_id, posts in Post.objects.filter(
+                group__isnull=False).values_list('author', 'group').annotate(
+                posts=Count('pk')).order_by().iterator(chunk_size=10000):
+            self.groups[author_id].add(group_id)
+            group_posts[group_id, author_id] = posts
+        by_group = defaultdict(list)
+        for (group_id, author_id), posts in group_posts.items():
+            by_group[group_id].append((posts, author_id))
+        self.group_authors = {
+            group_id: [
+                author_id for _, author_id in heapq.nlargest(
+                    GROUP_AUTHORS, authors)
+            ]
+            for group_id, authors in by_group.items()
+        }
+        self.popular = list(UserStats.objects.filter(
+            followers_count__gt=0
+        ).order_by('-followers_count').values_list(
+            'user', flat=True)[:settings.POSTS_SUGGESTIONS_COUNT * 3])
+
+    def candidates(self, user_id, limit):
+        following = self.following.get(user_id, set())
+        scores = Counter()
+        for friend_id in following:
+            for author_id in self.following.get(friend_id, ()):
+                scores[author_id] += FRIEND_WEIGHT
+        for group_id in self.groups.get(user_id, ()):
+            for author_id in self.group_authors.get(group_id, ()):
+                scores[author_id] += GROUP_WEIGHT
+        excluded = following | {user_id}
+        ranked = [
+            author_id for author_id, _ in sorted(
+                scores.items(), key=lambda item: (-item[1], item[0]))
+            if author_id not in excluded
+        ][:limit]
+        for author_id in self.popular:
+            if len(ranked) >= limit:
+                break
+            if author_id not in excluded and author_id not in ranked:
+                ranked.append(author_id)
+        return ranked
+
+
+def compute(user_ids=None, batch_size=1000):
+    """Пересчитывает рекомендации и возвращает число пользователей."""
+    graph = Graph()
+    limit = settings.POSTS_SUGGESTIONS_COUNT
+    usernames = dict(User.objects.values_list('pk', 'username'))
+    stored = Suggestions.objects.all()
+    if user_ids is None:
+        user_ids = list(usernames)
+    else:
+        stored = stored.filter(user__in=user_ids)
+    rows = []
+    for user_id in user_ids:
+        rows.append(Suggestions(user_id=user_id, usernames=SEPARATOR.join(
+            usernames[author_id]
+            for author_id in graph.candidates(user_id, limit)
+        )))
+    with transaction.atomic():
+        stored.delete()
+        Suggestions.objects.bulk_create(rows, batch_size=batch_size)
+    bump_version(SUGGESTIONS_SCOPE)
+    return len(rows)
+
+
+def for_user(user, exclude=()):
+    """Готовый список username для пользователя без текущих подписок.
+
+    Список читается одним запросом, подписки на авторов из него — вторым.
+    """
+    if not user.is_authenticated:
+        return []
+    stored = Suggestions.objects.filter(user=user).values_list(
+        'usernames', flat=True).first()
+    if not stored:
+        return []
+    usernames = [
+        username for username in stored.split(SEPARATOR)
+        if username not in exclude
+    ]
+    followed = set(Follow.objects.filter(
+        user=user, author__username__in=usernames
+    ).values_list('author__username', flat=True))
+    return [username for username in usernames if username not in followed]
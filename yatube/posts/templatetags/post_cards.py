@@ -0,0 +1,54 @@
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from core.routers import reading_replicas
+from posts import variants
+from posts.versions import get_version, get_versions, post_scope
+
+register = template.Library()
+
+CARD_TEMPLATE = 'includes/post_card.html'
+
+
+def card_key(post, version=None):
+    if version is None:
+        version = get_version(post_scope(post.pk))
+    return f'post_card:{post.pk}:{version}'
+
+
+def render_cards(posts):
+    """Пары (пост, HTML карточки) для страницы.
+
+    Версии и готовые карточки читаются двумя get_many на всю страницу,
+    недостающие карточки записываются одним set_many. Карточки постов,
+    прочитанных с реплики, не записываются: они могут быть старше версии.
+    """
+    posts = list(posts)
+    versions = get_versions([post_scope(post.pk) for post in posts])
+    keys = [
+        card_key(post, version) for post, version in zip(posts, versions)]
+    cached = cache.get_many(keys)
+    rendered = {}
+    cards = []
+    for post, key in zip(posts, keys):
+        html = cached.get(key)
+        if html is None:
+            html = rendered[key] = get_template(CARD_TEMPLATE).render(
+                {'post': post})
+        cards.append((post, mark_safe(html)))
+    if rendered and not reading_replicas():
+        cache.set_many(rendered, settings.POSTS_CARD_CACHE_TIMEOUT)
+    return cards
+
+
+@register.simple_tag
+def post_cards(posts):
+    return render_cards(posts)
+
+
+@register.filter
+def image_sources(post):
+    return variants.sources(post)
@@ -0,0 +1,85 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, TransactionTestCase
+
+from posts.benchmark import percentile
+from posts.management.commands.benchmark_views import VIEWS
+from posts.models import Comment, Follow, Post, User, UserStats
+
+
+class SeedBenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        call_command(
+            'seed_benchmark', users=60, posts=300, groups=3, comments=50,
+            max_following=30, batch_size=40, stdout=StringIO()
+        )
+
+    def test_volumes(self):
+        """создается заданное число объектов и пересчитываются счетчики"""
+        self.assertEqual(User.objects.count(), 60)
+        self.assertEqual(Post.objects.count(), 300)
+        self.assertEqual(Comment.objects.count(), 50)
+        self.assertEqual(UserStats.objects.count(), 60)
+        self.assertFalse(Follow.objects.filter(
+            user_id=F('author_id')).exists())
+
+    def test_follow_graph_is_skewed(self):
+        """подписчики распределены по степенному закону"""
+        followers = sorted(
+            UserStats.objects.values_list('followers_count', flat=True),
+            reverse=True)
+        self.assertGreater(followers[0], 5 * max(followers[30], 1))
+
+    def test_benchmark_writes_json(self):
+        """замер проходит по всем страницам и пишет сравнимый JSON"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'run.json')
+            call_command(
+                'benchmark_views', requests=3, warmup=1, cold=True,
+                output=path, stdout=StringIO()
+            )
+            out = StringIO()
+            call_command(
+                'benchmark_views', 'index', requests=3, warmup=1,
+                cold=True, compare=path, stdout=out
+            )
+            with open(path, encoding='utf-8') as stream:
+                report = json.load(stream)
+        self.assertEqual(set(report['views']), set(VIEWS))
+        for name, result in report['views'].items():
+            with self.subTest(view=name):
+                self.assertLessEqual(result['p50_ms'], result['p95_ms'])
+                self.assertGreater(result['queries'], 0)
+        self.assertIn('запросов +0', out.getvalue())
+
+    def test_percentile(self):
+        """перцентили считаются методом ближайшего ранга"""
+        values = list(range(1, 101))
+        self.assertEqual(percentile(values, 0.5), 50)
+        self.assertEqual(percentile(values, 0.95), 95)
+        self.assertEqual(percentile([7], 0.95), 7)
+
+
+class BenchmarkSqliteTests(TransactionTestCase):
+    # копия базы снимается через backup, а он ждет конца транзакции теста
+
+    def test_benchmark_sqlite(self):
+        """замер SQLite сравнивает обычный и настроенный профили"""
+        author = User.objects.create_user('author')
+        Post.objects.create(text='Пост', author=author)
+        out = StringIO()
+        call_command(
+            'benchmark_sqlite', seconds=0.2, threads=2, write_ratio=0.5,
+            stdout=out
+        )
+        lines = out.getvalue().splitlines()
+        self.assertEqual(
+            [line.split()[0] for line in lines], ['default', 'tuned'])
+        self.assertFalse(Comment.objects.exists())
@@ -0,0 +1,111 @@
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.reader = User.objects.create_user('reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group)
+        cls.urls = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.author}),
+            reverse('posts:post_details', kwargs={'post_id': cls.post.pk}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def revalidate(self, url, response, client=None):
+        return (client or self.client).get(
+            url, HTTP_IF_NONE_MATCH=response['ETag'])
+
+    def test_unchanged_pages_return_304_without_rendering(self):
+        """повторный запрос с тем же ETag получает 304 без шаблонов"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertTrue(response.has_header('Last-Modified'))
+                again = self.revalidate(url, response)
+                self.assertEqual(again.status_code, 304)
+                self.assertEqual(again.templates, [])
+                again = self.client.get(
+                    url,
+                    HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+                self.assertEqual(again.status_code, 304)
+
+    def test_etag_depends_on_user_and_query(self):
+        """ETag зависит от пользователя и параметров страницы"""
+        url = self.urls[0]
+        anonymous = self.client.get(url)
+        self.assertEqual(
+            self.revalidate(url, anonymous, self.reader_client).status_code,
+            200)
+        self.assertNotEqual(
+            self.client.get(url, {'page': 2})['ETag'], anonymous['ETag'])
+
+    def test_changes_invalidate_etag(self):
+        """изменения данных меняют ETag затронутых страниц"""
+        changes = (
+            (self.urls[3], lambda: Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий')),
+            (self.urls[2], lambda: Follow.objects.create(
+                user=self.reader, author=self.author)),
+            (self.urls[1], lambda: Group.objects.filter(
+                pk=self.group.pk).first().save()),
+            (self.urls[0], lambda: self.reader_client.post(
+                reverse('posts:post_create'), {'text': 'Новый пост'})),
+        )
+        for url, change in changes:
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                change()
+                self.assertEqual(self.revalidate(
+                    url, response, self.reader_client).status_code, 200)
+
+    def test_missing_objects(self):
+        """для несуществующих объектов остается 404"""
+        for url in (
+            reverse('posts:group_list', kwargs={'slug': 'missing'}),
+            reverse('posts:profile', kwargs={'username': 'missing'}),
+            reverse('posts:post_details', kwargs={'post_id': 10 ** 6}),
+        ):
+            with self.subTest(url=url):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH='"x"')
+                self.assertEqual(response.status_code, 404)
+
+    @override_settings(POSTS_CONDITIONAL_GET=False)
+    def test_disabled(self):
+        """без общих версий ETag и Last-Modified не выставляются"""
+        for url in self.urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertFalse(response.has_header('ETag'))
+                self.assertFalse(response.has_header('Last-Modified'))
+
+    @override_settings(DATABASE_REPLICAS=['replica_1'])
+    def test_replica_reads(self):
+        """прочитанное с реплики не кэшируется под версией и без ETag"""
+        card = f':post_card:{self.post.pk}:'
+        for url in self.urls[1:]:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertFalse(response.has_header('ETag'))
+                self.assertFalse(response.has_header('Last-Modified'))
+                self.assertFalse(any(card in key for key in cache._cache))
+        # кэшируемая главная собирается по основной базе
+        self.assertFalse(self.client.get(self.urls[0]).has_header('ETag'))
+        self.assertTrue(any(card in key for key in cache._cache))
+        with self.assertNumQueries(0):
+            self.client.get(self.urls[0])
@@ -0,0 +1,91 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts import feed
+from posts.models import Post, User, Follow, FeedEntry
+
+
+@override_settings(POSTS_FEED_FANOUT=True, POSTS_FEED_PULL_THRESHOLD=1)
+class FeedFanOutTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.popular = User.objects.create_user('popular')
+        cls.reader = User.objects.create_user('reader')
+        cls.other = User.objects.create_user('other')
+        cls.old_post = Post.objects.create(text='old', author=cls.author)
+        Follow.objects.create(user=cls.other, author=cls.popular)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def feed_posts(self):
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        return list(response.context['page_obj'])
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        """подписка заполняет ленту старыми постами, отписка очищает"""
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.author}))
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=self.old_post).exists())
+        self.assertEqual(self.feed_posts(), [self.old_post])
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow', kwargs={'username': self.author}))
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.feed_posts(), [])
+
+    def test_new_post_fans_out_to_followers(self):
+        """новый пост раскладывается по лентам подписчиков"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.author_client.post(
+            reverse('posts:post_create'), {'text': 'fresh post'})
+        post = Post.objects.get(text='fresh post')
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.assertEqual(self.feed_posts(), [post])
+
+    def test_popular_author_is_pulled_on_read(self):
+        """посты популярного автора не раскладываются, но видны в ленте"""
+        self.reader_client.get(reverse(
+            'posts:profile_follow', kwargs={'username': self.popular}))
+        post = Post.objects.create(text='popular post', author=self.popular)
+        self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+        self.assertEqual(self.feed_posts(), [post])
+
+    def test_rebuild_feeds_command(self):
+        """команда rebuild_feeds восстанавливает ленты по подпискам"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        call_command('rebuild_feeds', stdout=StringIO())
+        self.assertEqual(self.feed_posts(), [self.old_post])
+
+    def test_feed_reads_entries_index(self):
+        """разложенная лента читается по индексу записей читателя"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        posts = [
+            Post.objects.create(text=f'post {number}', author=self.author)
+            for number in range(3)
+        ]
+        page = feed.follow_feed(self.reader).for_feed()[:2]
+        self.assertIn('feed_user_date', page.explain())
+        self.assertEqual(list(page), posts[::-1][:2])
+        response = self.reader_client.get(
+            reverse('posts:follow_index') + '?after=')
+        page_obj = response.context['page_obj']
+        self.assertEqual(list(page_obj), posts[::-1])
+
+    def test_post_created_outside_views_fans_out(self):
+        """пост, созданный не через форму (например, в админке), в ленте"""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='admin post', author=self.author)
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=post).exists())
@@ -0,0 +1,107 @@
+from django.core.cache import cache
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import FeedEntry, Follow, Post, User, UserStats
+from posts.stats import count_for
+
+from .utils import QueryCountMixin
+
+
+class FollowBatchTests(QueryCountMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user('reader')
+        cls.authors = [
+            User.objects.create_user(f'author{number}')
+            for number in range(3)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.url = reverse('posts:follow_batch')
+
+    def post(self, usernames, action='follow'):
+        return self.client.post(
+            self.url, {'username': usernames, 'action': action})
+
+    def assertStatsConsistent(self):
+        for user in (self.reader, *self.authors):
+            with self.subTest(user=user.username):
+                stats = UserStats.objects.filter(user=user).values(
+                    'followers_count', 'following_count').first()
+                if stats is None:
+                    continue
+                counts = count_for(user.pk)
+                self.assertEqual(
+                    stats['followers_count'], counts['followers_count'])
+                self.assertEqual(
+                    stats['following_count'], counts['following_count'])
+
+    def test_follow_many(self):
+        """подписка на несколько авторов одним запросом"""
+        UserStats.objects.create(user=self.authors[0])
+        Follow.objects.create(user=self.reader, author=self.authors[1])
+        response = self.post(
+            ['author0', 'author1', 'author2', 'ghost', 'reader'])
+        self.assertEqual(response.json(), {
+            'following': ['author0', 'author1', 'author2'],
+            'changed': ['author0', 'author2'],
+            'missing': ['ghost'],
+        })
+        self.assertEqual(
+            Follow.objects.filter(user=self.reader).count(), 3)
+        self.assertStatsConsistent()
+
+    def test_unfollow_many(self):
+        """отписка от нескольких авторов одним запросом"""
+        self.post(['author0', 'author1', 'author2'])
+        response = self.post(['author0', 'author2'], action='unfollow')
+        self.assertEqual(response.json()['changed'], ['author0', 'author2'])
+        self.assertEqual(
+            list(Follow.objects.filter(user=self.reader).values_list(
+                'author__username', flat=True)),
+            ['author1'])
+        self.assertStatsConsistent()
+
+    def test_queries_do_not_depend_on_batch_size(self):
+        """число запросов не растет с числом авторов"""
+        extra = [
+            User.objects.create_user(f'extra{number}')
+            for number in range(10)
+        ]
+        UserStats.objects.bulk_create(
+            UserStats(user=user) for user in [self.reader, *self.authors,
+                                              *extra])
+        # +1 запрос: свежие посты авторов для рейтинга популярного
+        with self.assertMaxQueries(9):
+            self.post(['author0', 'author1'])
+        with self.assertMaxQueries(9):
+            self.post([user.username for user in extra])
+        with self.assertMaxQueries(8):
+            self.post([user.username for user in extra], action='unfollow')
+
+    @override_settings(POSTS_FEED_FANOUT=True)
+    def test_feed_is_updated(self):
+        """лента подписок заполняется и очищается"""
+        post = Post.objects.create(text='Пост', author=self.authors[0])
+        self.post(['author0'])
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=post).exists())
+        self.post(['author0'], action='unfollow')
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+
+    @override_settings(POSTS_FOLLOW_BATCH_LIMIT=2)
+    def test_bad_requests(self):
+        """неверные запросы отклоняются"""
+        self.assertEqual(self.client.get(self.url).status_code, 405)
+        self.assertEqual(
+            self.post(['author0'], action='block').status_code, 400)
+        self.assertEqual(
+            self.post(['author0', 'author1', 'author2']).status_code, 400)
+        response = Client().post(self.url, {'username': ['author0']})
+        self.assertRedirects(
+            response, f'{reverse("users:login")}?next={self.url}')
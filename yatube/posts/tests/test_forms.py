@@ -1,11 +1,14 @@
 import shutil
 import tempfile
+from io import BytesIO
 
 from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image
 
+from posts.forms import PostForm
 from posts.models import Post, Group, User, Comment
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
@@ -128,3 +131,74 @@ class PostsFormsTest(TestCase):
                          comments_count + 1)
         self.assertRedirects(response, reverse(
             'posts:post_details', kwargs={'post_id': self.post.id}))
+
+
+def make_jpeg(size, name='photo.jpg'):
+    buffer = BytesIO()
+    exif = Image.Exif()
+    exif[0x010F] = 'Test camera'
+    Image.new('RGB', size, 'red').save(buffer, 'JPEG', exif=exif)
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/jpeg')
+
+
+def make_xpm(background, name='icon.xpm'):
+    rows = ['"4 2 2 1"', '"a c #FF0000"', f'"b c {background}"',
+            '"aaab"', '"abaa"']
+    content = '/* XPM */\nstatic char *icon[] = {\n%s\n};\n' % (
+        ',\n'.join(rows))
+    return SimpleUploadedFile(name, content.encode(), 'image/x-xpixmap')
+
+
+@override_settings(POSTS_IMAGE_MAX_SIZE=(200, 200))
+class PostFormImageTest(TestCase):
+    def test_image_downscaled_and_stripped(self):
+        """большая картинка уменьшается и теряет метаданные"""
+        form = PostForm(
+            data={'text': 'text'}, files={'image': make_jpeg((800, 400))})
+        self.assertTrue(form.is_valid(), form.errors)
+        image = form.cleaned_data['image']
+        self.assertEqual(image.name, 'photo.jpg')
+        with Image.open(image) as result:
+            self.assertEqual(result.size, (200, 100))
+            self.assertEqual(result.format, 'JPEG')
+            self.assertNotIn('exif', result.info)
+
+    @override_settings(POSTS_IMAGE_MAX_PIXELS=100)
+    def test_too_large_image_rejected(self):
+        """картинка с огромным числом пикселей отклоняется"""
+        form = PostForm(
+            data={'text': 'text'}, files={'image': make_jpeg((20, 20))})
+        self.assertFalse(form.is_valid())
+        self.assertIn('image', form.errors)
+
+    def test_unsaveable_format_reencoded(self):
+        """формат, который Pillow не пишет, перекодируется в JPEG или PNG"""
+        cases = (
+            ('#00FF00', 'icon.jpg', 'JPEG', 'image/jpeg'),
+            ('None', 'icon.png', 'PNG', 'image/png'),
+        )
+        for background, name, image_format, content_type in cases:
+            with self.subTest(background=background):
+                form = PostForm(
+                    data={'text': 'text'},
+                    files={'image': make_xpm(background)})
+                self.assertTrue(form.is_valid(), form.errors)
+                image = form.cleaned_data['image']
+                self.assertEqual(image.name, name)
+                self.assertEqual(image.content_type, content_type)
+                with Image.open(image) as result:
+                    self.assertEqual(result.format, image_format)
+                    self.assertEqual(result.size, (4, 2))
+
+    def test_animated_image_rejected(self):
+        """анимированный GIF отклоняется, а не теряет кадры"""
+        buffer = BytesIO()
+        frames = [Image.new('P', (10, 10), color) for color in (1, 2)]
+        frames[0].save(
+            buffer, 'GIF', save_all=True, append_images=frames[1:])
+        upload = SimpleUploadedFile(
+            'anim.gif', buffer.getvalue(), 'image/gif')
+        form = PostForm(data={'text': 'text'}, files={'image': upload})
+        self.assertFalse(form.is_valid())
+        self.assertEqual(form.errors.as_data()['image'][0].code,
+                         'image_animated')
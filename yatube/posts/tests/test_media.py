@@ -0,0 +1,67 @@
+import shutil
+
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+
+from posts.models import Post, User
+
+from .test_forms import TEMP_MEDIA_ROOT, make_jpeg
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_DEDUPLICATE_MEDIA=True)
+class ContentHashStorageTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def create_post(self, text, name):
+        self.author_client.post(reverse('posts:post_create'), {
+            'text': text, 'image': make_jpeg((40, 20), name)})
+        return Post.objects.get(text=text)
+
+    def test_same_image_stored_once(self):
+        """одинаковые картинки хранятся одним файлом до удаления постов"""
+        first = self.create_post('first', 'first.jpg')
+        second = self.create_post('second', 'second.JPG')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r'^posts/[0-9a-f]{2}/[0-9a-f]{64}'
+                                           r'\.jpg$')
+        storage = first.image.storage
+        first.delete()
+        self.assertTrue(storage.exists(second.image.name))
+        second.delete()
+        self.assertFalse(storage.exists(second.image.name))
+
+    def test_replaced_image_released(self):
+        """замена картинки удаляет прежний файл без других ссылок"""
+        post = self.create_post('post', 'first.jpg')
+        old_name = post.image.name
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+            {'text': 'post', 'image': make_jpeg((60, 20), 'second.jpg')}
+        )
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertFalse(post.image.storage.exists(old_name))
+        self.assertTrue(post.image.storage.exists(post.image.name))
+
+    def test_same_image_reuploaded(self):
+        """повторная загрузка тех же байтов не удаляет файл поста"""
+        post = self.create_post('post', 'first.jpg')
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+            {'text': 'post', 'image': make_jpeg((40, 20), 'again.jpg')}
+        )
+        edited = Post.objects.get(pk=post.pk)
+        self.assertEqual(edited.image.name, post.image.name)
+        self.assertTrue(edited.image.storage.exists(edited.image.name))
@@ -1,6 +1,7 @@
+from django.db import IntegrityError, transaction
 from django.test import TestCase
 
-from posts.models import Post, Group, User, CHARS_IN_STR
+from posts.models import Post, Group, User, Follow, CHARS_IN_STR
 
 
 class PostModelTest(TestCase):
@@ -52,3 +53,14 @@ class PostModelTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(
                     self.post._meta.get_field(field).help_text, expected_value)
+
+
+class FollowModelTest(TestCase):
+    def test_follow_is_unique(self):
+        """на автора нельзя подписаться дважды"""
+        user = User.objects.create_user('user')
+        author = User.objects.create_user('author')
+        Follow.objects.create(user=user, author=author)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=user, author=author)
+        self.assertEqual(Follow.objects.count(), 1)
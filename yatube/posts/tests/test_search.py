@@ -0,0 +1,85 @@
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Post, SearchTerm, User
+from posts.search import (
+    FtsBackend, InvertedIndexBackend, get_backend, search_posts
+)
+from posts.views import POSTS_ON_SCREEN
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user('author')
+        cls.weak = Post.objects.create(
+            text='Заметка про котов и собак', author=cls.user)
+        cls.strong = Post.objects.create(
+            text='Коты, коты и снова коты', author=cls.user)
+        Post.objects.create(text='Про собак', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def search(self, query, **params):
+        return self.client.get(
+            reverse('posts:search'), {'q': query, **params})
+
+    def test_backend_is_fts_on_sqlite(self):
+        """на SQLite используется индекс FTS5"""
+        self.assertIsInstance(get_backend(), FtsBackend)
+
+    def test_results_are_ranked(self):
+        """найденные посты отсортированы по релевантности"""
+        response = self.search('коты')
+        self.assertEqual(list(response.context['page_obj']), [self.strong])
+        self.assertEqual(list(search_posts('про собак')[:10]), [
+            Post.objects.get(text='Про собак'), self.weak])
+
+    def test_empty_query(self):
+        """пустой запрос ничего не находит"""
+        for query in ('', '   ', '!!!'):
+            with self.subTest(query=query):
+                response = self.search(query)
+                self.assertEqual(len(response.context['page_obj']), 0)
+
+    def test_pagination_keeps_query(self):
+        """страницы выдачи сохраняют поисковый запрос"""
+        Post.objects.bulk_create(
+            Post(text=f'пагинация {i}', author=self.user)
+            for i in range(POSTS_ON_SCREEN + 3)
+        )
+        get_backend().rebuild()
+        response = self.search('пагинация', page=2)
+        self.assertEqual(len(response.context['page_obj']), 3)
+        self.assertEqual(
+            response.context['page_obj'].paginator.count, POSTS_ON_SCREEN + 3)
+        self.assertContains(response, '?page=1&q=')
+
+    def test_index_follows_edit_and_delete(self):
+        """индекс обновляется при правке и удалении поста"""
+        post = Post.objects.create(text='черновик', author=self.user)
+        self.assertEqual(search_posts('черновик').count(), 1)
+        post.text = 'чистовик'
+        post.save()
+        self.assertEqual(search_posts('черновик').count(), 0)
+        self.assertEqual(search_posts('чистовик').count(), 1)
+        post.delete()
+        self.assertEqual(search_posts('чистовик').count(), 0)
+
+    def test_inverted_index_backend(self):
+        """обратный индекс находит посты со всеми словами запроса"""
+        backend = InvertedIndexBackend()
+        backend.rebuild()
+        self.assertTrue(SearchTerm.objects.exists())
+        self.assertEqual(backend.count('собак'), 2)
+        self.assertEqual(backend.ranked_ids('коты', 0, 10), [self.strong.pk])
+        self.assertEqual(backend.count('котов собак'), 1)
+        self.assertEqual(
+            list(backend.filter(Post.objects.all(), 'про собак')),
+            list(Post.objects.filter(text__icontains='собак')))
+        backend.remove(self.strong.pk)
+        self.assertEqual(backend.count('коты'), 0)
@@ -0,0 +1,68 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Post, User, Comment, Follow, UserStats
+
+
+class UserStatsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.user = User.objects.create_user('user')
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        """счетчики обновляются при создании и удалении записей"""
+        post = Post.objects.create(text='post', author=self.author)
+        comment = Comment.objects.create(
+            text='comment', author=self.user, post=post)
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        author_stats = self.stats(self.author)
+        user_stats = self.stats(self.user)
+        values = {
+            author_stats.posts_count: 1,
+            author_stats.followers_count: 1,
+            user_stats.following_count: 1,
+            user_stats.comments_count: 1,
+        }
+        for value, expected_value in values.items():
+            with self.subTest(value=value):
+                self.assertEqual(value, expected_value)
+        comment.delete()
+        follow.delete()
+        post.delete()
+        author_stats.refresh_from_db()
+        user_stats.refresh_from_db()
+        self.assertEqual(author_stats.posts_count, 0)
+        self.assertEqual(author_stats.followers_count, 0)
+        self.assertEqual(user_stats.following_count, 0)
+        self.assertEqual(user_stats.comments_count, 0)
+
+    def test_rebuild_user_stats_command(self):
+        """команда rebuild_user_stats исправляет расхождения счетчиков"""
+        Post.objects.create(text='post', author=self.author)
+        UserStats.objects.filter(user=self.author).update(posts_count=42)
+        call_command('rebuild_user_stats', stdout=StringIO())
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+        self.assertEqual(self.stats(self.user).posts_count, 0)
+
+    def test_pages_read_counters(self):
+        """профиль и пост показывают счетчик, даже если его еще нет"""
+        post = Post.objects.create(text='post', author=self.author)
+        UserStats.objects.all().delete()
+        client = Client()
+        paths = (
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:post_details', kwargs={'post_id': post.id}),
+        )
+        for path in paths:
+            with self.subTest(path=path):
+                response = client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(self.stats(self.author).posts_count, 1)
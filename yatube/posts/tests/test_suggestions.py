@@ -0,0 +1,108 @@
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts import suggestions
+from posts.models import Follow, Group, Post, Suggestions, User
+
+
+class SuggestionsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user('reader')
+        cls.friend = User.objects.create_user('friend')
+        cls.fof = User.objects.create_user('fof')
+        cls.group_author = User.objects.create_user('group_author')
+        cls.star = User.objects.create_user('star')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=cls.reader, author=cls.friend)
+        Follow.objects.create(user=cls.friend, author=cls.fof)
+        Follow.objects.create(user=cls.friend, author=cls.reader)
+        Follow.objects.create(user=cls.fof, author=cls.star)
+        Follow.objects.create(user=cls.group_author, author=cls.star)
+        for author in (cls.reader, cls.group_author):
+            Post.objects.create(text='Пост', author=author, group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_ranking(self):
+        """друзья друзей, затем авторы сообществ, затем популярные"""
+        suggestions.compute()
+        self.assertEqual(
+            suggestions.for_user(self.reader),
+            ['fof', 'group_author', 'star'])
+
+    def test_excludes_followed_and_self(self):
+        """в рекомендациях нет самого пользователя и его подписок"""
+        suggestions.compute()
+        self.assertEqual(
+            suggestions.for_user(self.friend), ['star'])
+        self.assertEqual(
+            suggestions.for_user(self.reader, exclude={'fof'}),
+            ['group_author', 'star'])
+
+    def test_partial_recompute(self):
+        """пересчет части пользователей не трогает остальных"""
+        suggestions.compute()
+        Follow.objects.create(user=self.reader, author=self.fof)
+        suggestions.compute([self.reader.pk])
+        self.assertEqual(
+            suggestions.for_user(self.reader), ['star', 'group_author'])
+        self.assertEqual(Suggestions.objects.count(), User.objects.count())
+
+    def test_two_queries(self):
+        """готовый список и подписки на его авторов — два запроса"""
+        suggestions.compute()
+        with self.assertNumQueries(2):
+            suggestions.for_user(self.reader)
+
+    def test_followed_after_compute(self):
+        """автор, на которого подписались после расчета, сразу пропадает"""
+        suggestions.compute()
+        client = Client()
+        client.force_login(self.reader)
+        url = reverse('posts:profile', kwargs={'username': 'friend'})
+        response = client.get(url)
+        self.assertEqual(
+            response.context['suggestions'], ['fof', 'group_author', 'star'])
+        client.post(reverse('posts:profile_follow', args=['fof']))
+        self.assertEqual(
+            suggestions.for_user(self.reader), ['group_author', 'star'])
+        response = client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.context['suggestions'], ['group_author', 'star'])
+
+    def test_anonymous_and_missing(self):
+        """без расчета и для гостя список пуст"""
+        client = Client()
+        self.assertEqual(suggestions.for_user(self.reader), [])
+        response = client.get(reverse('posts:index'))
+        self.assertEqual(suggestions.for_user(response.wsgi_request.user), [])
+
+    def test_command(self):
+        """команда compute_suggestions считает всех пользователей"""
+        call_command('compute_suggestions', stdout=StringIO())
+        self.assertEqual(Suggestions.objects.count(), User.objects.count())
+
+    def test_shown_on_pages(self):
+        """рекомендации выводятся в ленте подписок и в профиле"""
+        suggestions.compute()
+        client = Client()
+        client.force_login(self.reader)
+        pages = {
+            reverse('posts:follow_index'): ['fof', 'group_author', 'star'],
+            reverse('posts:profile', kwargs={'username': 'fof'}): [
+                'group_author', 'star'],
+        }
+        for url, expected in pages.items():
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertEqual(response.context['suggestions'], expected)
+                self.assertContains(
+                    response, reverse('posts:profile', args=[expected[0]]))
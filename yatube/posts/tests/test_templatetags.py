@@ -0,0 +1,69 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import TestCase, Client
+from django.urls import reverse
+
+from posts.models import Post, Group, User, Comment
+from posts.templatetags.post_cards import card_key, render_cards
+
+
+class PostCardCacheTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.group = Group.objects.create(
+            title='group',
+            slug='test-slug',
+            description='description'
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='cached text', author=self.author, group=self.group)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.group_path = reverse(
+            'posts:group_list', kwargs={'slug': self.group.slug})
+
+    def test_card_is_cached_and_shared(self):
+        """карточка рендерится один раз и переиспользуется на страницах"""
+        self.author_client.get(self.group_path)
+        self.assertIn('cached text', cache.get(card_key(self.post)))
+        Post.objects.filter(pk=self.post.pk).update(text='silent update')
+        response = self.author_client.get(reverse(
+            'posts:profile', kwargs={'username': self.author}))
+        self.assertContains(response, 'cached text')
+
+    def test_card_invalidated_on_edit_and_comment(self):
+        """правка поста и новый комментарий сразу видны в карточке"""
+        self.author_client.get(self.group_path)
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            {'text': 'edited text', 'group': self.group.id}
+        )
+        response = self.author_client.get(self.group_path)
+        self.assertContains(response, 'edited text')
+        self.assertNotContains(response, 'cached text')
+        Comment.objects.create(
+            text='comment', author=self.author, post=self.post)
+        response = self.author_client.get(self.group_path)
+        self.assertContains(response, 'Комментариев: 1')
+
+    def test_page_reads_cards_in_two_cache_calls(self):
+        """версии и карточки страницы читаются двумя get_many"""
+        for number in range(5):
+            Post.objects.create(text=f'post {number}', author=self.author)
+        self.author_client.get(self.group_path)
+        posts = list(Post.objects.for_feed())
+        render_cards(posts)
+        spy = mock.Mock(wraps=cache)
+        with mock.patch('posts.templatetags.post_cards.cache', spy), \
+                mock.patch('posts.versions.cache', spy):
+            cards = render_cards(posts)
+        self.assertEqual(
+            [call[0] for call in spy.method_calls], ['get_many', 'get_many'])
+        self.assertEqual([post for post, _ in cards], posts)
+        self.assertIn('post 4', cards[0][1])
@@ -0,0 +1,97 @@
+import os
+import shutil
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, Client, override_settings
+from django.urls import reverse
+from sorl.thumbnail import default
+from sorl.thumbnail.images import ImageFile
+
+from posts.models import Post, User
+from posts import variants
+from posts.thumbnails import THUMBNAIL_SIZES
+
+from .test_forms import TEST_IMAGE, TEMP_MEDIA_ROOT, make_jpeg
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POSTS_THUMBNAIL_WORKERS=0)
+class ThumbnailPregenerationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def run_on_commit(self):
+        """выполняет отложенные до фиксации транзакции задачи"""
+        callbacks = connection.run_on_commit
+        connection.run_on_commit = []
+        for _, callback in callbacks:
+            callback()
+
+    def test_post_create_pregenerates_thumbnails(self):
+        """после публикации миниатюры уже лежат в хранилище sorl"""
+        TEST_IMAGE.seek(0)
+        self.author_client.post(
+            reverse('posts:post_create'),
+            {'text': 'post with image', 'image': TEST_IMAGE}
+        )
+        post = Post.objects.get(text='post with image')
+        source = ImageFile(post.image)
+        self.assertIsNone(
+            default.kvstore._get(source.key, identity='thumbnails'))
+        self.run_on_commit()
+        keys = default.kvstore._get(source.key, identity='thumbnails')
+        self.assertEqual(len(keys), len(THUMBNAIL_SIZES))
+        for key in keys:
+            with self.subTest(key=key):
+                self.assertTrue(default.kvstore._get(key).exists())
+
+    def test_image_variants_in_card(self):
+        """варианты картинки сохраняются и попадают в srcset карточки"""
+        cache.clear()
+        TEST_IMAGE.seek(0)
+        post = Post.objects.create(
+            text='post with variants', author=self.author, image=TEST_IMAGE)
+        manifest = variants.generate(post)
+        self.assertIn('image/webp', manifest)
+        names = [name for _, name in manifest['image/webp']]
+        for name in names:
+            with self.subTest(name=name):
+                self.assertTrue(post.image.storage.exists(name))
+        response = self.author_client.get(reverse(
+            'posts:profile', kwargs={'username': self.author}))
+        self.assertContains(response, 'type="image/webp"')
+        self.assertContains(response, os.path.basename(names[0]))
+        post.delete()
+        for name in names:
+            with self.subTest(name=name):
+                self.assertFalse(post.image.storage.exists(name))
+
+    def test_replaced_image_resets_variants(self):
+        """замена картинки сразу сбрасывает манифест прежних вариантов"""
+        TEST_IMAGE.seek(0)
+        post = Post.objects.create(
+            text='post', author=self.author, image=TEST_IMAGE)
+        manifest = variants.generate(post)
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': post.id}),
+            {'text': 'post', 'image': make_jpeg((60, 20), 'second.jpg')}
+        )
+        post.refresh_from_db()
+        self.assertEqual(post.image_variants, '')
+        for _, name in manifest['image/webp']:
+            with self.subTest(name=name):
+                self.assertFalse(post.image.storage.exists(name))
+        self.run_on_commit()
+        post.refresh_from_db()
+        self.assertIn('image/webp', variants.load_manifest(post))
@@ -0,0 +1,110 @@
+import datetime as dt
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import TestCase
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post, User, UserStats
+from posts.search import search_posts
+from posts.transfer import Importer
+
+
+class TransferTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author', first_name='Лев')
+        cls.reader = User.objects.create_user('reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание')
+        cls.post = Post.objects.create(
+            text='Перенесенный пост', author=cls.author, group=cls.group)
+        cls.pub_date = timezone.now() - dt.timedelta(days=30)
+        Post.objects.filter(pk=cls.post.pk).update(pub_date=cls.pub_date)
+        Comment.objects.create(
+            post=cls.post, author=cls.reader, text='Комментарий')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def export(self):
+        out = StringIO()
+        call_command('export_yatube', stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def import_file(self, data, *args):
+        with tempfile.NamedTemporaryFile(
+                'w', suffix='.ndjson', delete=False, encoding='utf-8') as f:
+            f.write(data)
+        self.addCleanup(os.remove, f.name)
+        call_command('import_yatube', f.name, *args, stdout=StringIO())
+
+    def test_export_is_ndjson_in_dependency_order(self):
+        """выгрузка — по записи в строке, зависимости идут раньше"""
+        records = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual(
+            [record['type'] for record in records],
+            ['user', 'user', 'group', 'post', 'comment', 'follow'])
+        self.assertEqual(records[3]['author__username'], 'author')
+        self.assertEqual(records[3]['group__slug'], 'group')
+
+    def test_round_trip(self):
+        """загрузка выгрузки восстанавливает данные и производные таблицы"""
+        data = self.export()
+        User.objects.all().delete()
+        Group.objects.all().delete()
+        self.import_file(data, '--batch-size=2')
+        post = Post.objects.select_related('author', 'group').get()
+        self.assertEqual(post.pk, self.post.pk)
+        self.assertEqual(post.author.first_name, 'Лев')
+        self.assertEqual(post.group.slug, 'group')
+        self.assertEqual(post.pub_date, self.pub_date)
+        self.assertEqual(post.comments.get().author.username, 'reader')
+        self.assertTrue(Follow.objects.filter(
+            user__username='reader', author__username='author').exists())
+        stats = UserStats.objects.get(user=post.author)
+        self.assertEqual((stats.posts_count, stats.followers_count), (1, 1))
+        self.assertEqual(list(search_posts('перенесенный')[:1]), [post])
+
+    def test_repeated_import_is_idempotent(self):
+        """повторная загрузка не создает дублей"""
+        data = self.export()
+        self.import_file(data)
+        self.import_file(data)
+        for model in (User, Group, Post, Comment, Follow):
+            with self.subTest(model=model.__name__):
+                self.assertEqual(model.objects.count(), {
+                    User: 2, Group: 1, Post: 1, Comment: 1, Follow: 1,
+                }[model])
+
+    def test_conflicting_ids_are_remapped(self):
+        """занятые чужими постами id заменяются, комментарии не путаются"""
+        data = self.export()
+        Post.objects.all().delete()
+        other = Post.objects.create(
+            pk=self.post.pk, text='Чужой пост', author=self.reader)
+        loaded = Importer().load(data.splitlines())
+        self.assertEqual(
+            loaded,
+            {'user': 0, 'group': 0, 'post': 1, 'comment': 1, 'follow': 0})
+        imported = Post.objects.get(text='Перенесенный пост')
+        self.assertNotEqual(imported.pk, other.pk)
+        self.assertEqual(imported.comments.get().text, 'Комментарий')
+        self.assertFalse(other.comments.exists())
+        self.assertEqual(
+            set(Importer().load(data.splitlines()).values()), {0})
+
+    def test_bad_input(self):
+        """битые строки и неизвестные авторы дают понятную ошибку"""
+        for data in (
+            'not json\n',
+            '{"type": "unknown"}\n',
+            '{"type": "follow", "user__username": "ghost",'
+            ' "author__username": "author"}\n',
+        ):
+            with self.subTest(data=data):
+                with self.assertRaises(CommandError):
+                    self.import_file(data)
@@ -0,0 +1,132 @@
+import datetime
+import math
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase, Client
+from django.urls import reverse
+from django.utils import timezone
+
+from posts import trending
+from posts.follows import follow_many
+from posts.models import (
+    Comment, Follow, Group, Post, TrendingGroup, TrendingPost, User
+)
+from posts.transfer import keep_dates
+
+
+class TrendingTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.reader = User.objects.create_user('reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.other_group = Group.objects.create(title='Другая', slug='other')
+
+    def setUp(self):
+        self.client = Client()
+
+    def score(self, post):
+        return TrendingPost.objects.get(post=post).score
+
+    def old_post(self, days=30, **kwargs):
+        with keep_dates():
+            return Post.objects.create(
+                text='Старый пост', author=self.author,
+                pub_date=timezone.now() - datetime.timedelta(days=days),
+                **kwargs)
+
+    def test_decay(self):
+        """событие старше на период полураспада весит вдвое меньше"""
+        now = timezone.now()
+        with self.settings(POSTS_TRENDING_HALF_LIFE=3600):
+            difference = trending.event_score(1, now) - trending.event_score(
+                1, now - datetime.timedelta(hours=1))
+        self.assertAlmostEqual(difference, math.log(2))
+        self.assertAlmostEqual(
+            trending.log_add(math.log(2), math.log(3)), math.log(5))
+        self.assertAlmostEqual(
+            trending.log_add(5000, 5000), 5000 + math.log(2))
+
+    def test_comments_raise_post(self):
+        """комментарии поднимают пост выше более свежего"""
+        commented = self.old_post(days=1, group=self.group)
+        fresh = Post.objects.create(
+            text='Свежий пост', author=self.author, group=self.other_group)
+        self.assertGreater(self.score(fresh), self.score(commented))
+        for _ in range(3):
+            Comment.objects.create(
+                text='Комментарий', author=self.reader, post=commented)
+        self.assertGreater(self.score(commented), self.score(fresh))
+        self.assertEqual(
+            trending.as_posts(trending.trending_posts()), [commented, fresh])
+        self.assertEqual(
+            [row.group for row in trending.trending_groups()],
+            [self.group, self.other_group])
+
+    def test_follows_raise_recent_posts(self):
+        """новые подписчики поднимают свежие посты автора"""
+        post = Post.objects.create(text='Пост', author=self.author)
+        old = self.old_post()
+        old_score = self.score(old)
+        score = self.score(post)
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertGreater(self.score(post), score)
+        follower = User.objects.create_user('follower')
+        score = self.score(post)
+        follow_many(follower, [self.author])
+        self.assertGreater(self.score(post), score)
+        self.assertEqual(self.score(old), old_score)
+
+    def test_window(self):
+        """посты без активности за окно на странице не показываются"""
+        old = self.old_post()
+        self.assertNotIn(
+            old, trending.as_posts(trending.trending_posts()))
+        Comment.objects.create(text='Свежий', author=self.reader, post=old)
+        self.assertIn(old, trending.as_posts(trending.trending_posts()))
+
+    def test_rebuild_matches_incremental(self):
+        """пересчет совпадает с накопленным рейтингом и чистит старое"""
+        post = Post.objects.create(
+            text='Пост', author=self.author, group=self.group)
+        Comment.objects.create(text='Комментарий', author=self.reader,
+                               post=post)
+        old = self.old_post()
+        expected = self.score(post)
+        group_score = TrendingGroup.objects.get(group=self.group).score
+        call_command('rebuild_trending', stdout=StringIO())
+        self.assertAlmostEqual(self.score(post), expected)
+        self.assertAlmostEqual(
+            TrendingGroup.objects.get(group=self.group).score, group_score)
+        self.assertFalse(TrendingPost.objects.filter(post=old).exists())
+
+    def test_reads_score_index(self):
+        """страница читает таблицу рейтинга без GROUP BY по комментариям"""
+        sql = str(trending.trending_posts()[:10].query).upper()
+        self.assertIn('FROM "POSTS_TRENDINGPOST"', sql)
+        self.assertNotIn(
+            'GROUP BY', sql.split('FROM "POSTS_TRENDINGPOST"')[-1])
+
+    def test_page(self):
+        """страница популярного — посты по рейтингу и сообщества"""
+        posts = [
+            Post.objects.create(
+                text=f'Пост {number}', author=self.author, group=self.group)
+            for number in range(3)
+        ]
+        Comment.objects.create(
+            text='Комментарий', author=self.reader, post=posts[0])
+        url = reverse('posts:trending')
+        self.client.get(url)
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertEqual(
+            list(response.context['page_obj']),
+            [posts[0], posts[2], posts[1]])
+        self.assertEqual(
+            [post.comment_count for post in response.context['page_obj']],
+            [1, 0, 0])
+        self.assertContains(response, self.group.title)
+        self.assertTemplateUsed(response, 'posts/trending.html')
@@ -5,13 +5,14 @@ from django.test import TestCase, Client, override_settings
 from django.urls import reverse
 from django.core.cache import cache
 from django.core.paginator import Page
-from django.db.models.query import QuerySet
 
 from posts.models import Post, Group, User, Comment, Follow
-from posts.views import POSTS_ON_SCREEN
+from posts.paginator import encode_cursor
+from posts.views import POSTS_ON_SCREEN, COMMENTS_ON_SCREEN
 from posts.forms import PostForm
 
 from .test_forms import TEST_IMAGE, TEMP_MEDIA_ROOT
+from .utils import QueryCountMixin
 
 FIRST_PAGE_RECORDS = POSTS_ON_SCREEN
 SECOND_PAGE_RECORDS = 3
@@ -183,8 +184,8 @@ class PostsViewsContextTest(TestCase):
         post = response.context['post']
         self.assertIsInstance(post, Post)
         comments = response.context['comments']
-        self.assertIsInstance(comments, QuerySet)
-        self.assertNotEqual(comments, 0)
+        self.assertIsInstance(comments, Page)
+        self.assertNotEqual(len(comments), 0)
         comment = response.context['comments'][0]
         self.assertIsInstance(comment, Comment)
         fields = {
@@ -201,6 +202,28 @@ class PostsViewsContextTest(TestCase):
             with self.subTest(field=field):
                 self.assertEqual(field, expected_value)
 
+    def test_post_comments_pages(self):
+        """комментарии выводятся порциями и догружаются через JSON"""
+        Comment.objects.bulk_create(
+            Comment(text=f'comment {num}', author=self.user, post=self.post)
+            for num in range(COMMENTS_ON_SCREEN)
+        )
+        response = self.author_client.get(reverse(
+            'posts:post_details', kwargs={'post_id': self.post.id}))
+        comments = response.context['comments']
+        self.assertEqual(len(comments), COMMENTS_ON_SCREEN)
+        with self.assertNumQueries(0):
+            [comment.author.username for comment in comments]
+        self.assertTrue(comments.has_next())
+        response = self.author_client.get(
+            reverse('posts:post_comments', kwargs={'post_id': self.post.id}),
+            {'after': comments.next_cursor}
+        )
+        data = response.json()
+        self.assertIsNone(data['next'])
+        self.assertIn(self.comment.text, data['html'])
+        self.assertNotIn(comments[0].text, data['html'])
+
     def test_post_create_context(self):
         """в post_create передан правильный context"""
         response = self.author_client.get(reverse('posts:post_create'))
@@ -239,7 +262,8 @@ class PostsViewsContextTest(TestCase):
         """проверка работы кэша главной страницы"""
         test_response = self.author_client.get(reverse('posts:index'))
         test_content = test_response.content
-        Post.objects.get(id=self.post.id).delete()
+        # update() не посылает сигналов и версию кэша не меняет
+        Post.objects.filter(id=self.post.id).update(text='changed in db')
         response = self.author_client.get(reverse('posts:index'))
         content = response.content
         self.assertEqual(test_content, content)
@@ -248,6 +272,31 @@ class PostsViewsContextTest(TestCase):
         content = response.content
         self.assertNotEqual(test_content, content)
 
+    def test_index_cache_invalidated_on_writes(self):
+        """публикация через сайт сразу сбрасывает кэш главной страницы"""
+        self.author_client.get(reverse('posts:index'))
+        self.author_client.post(
+            reverse('posts:post_create'), {'text': 'brand new post'})
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertContains(response, 'brand new post')
+        self.author_client.post(
+            reverse('posts:post_edit', kwargs={'post_id': self.post.id}),
+            {'text': 'edited post', 'group': self.group.id}
+        )
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertContains(response, 'edited post')
+
+    def test_index_cache_invalidated_by_orm_writes(self):
+        """удаление постов вне сайта (каскадом от автора) сбрасывает кэш"""
+        self.author_client.get(reverse('posts:index'))
+        Comment.objects.create(
+            text='orm comment', author=self.user, post=self.post)
+        response = self.author_client.get(reverse('posts:index'))
+        self.assertContains(response, 'Комментариев: 2')
+        User.objects.filter(pk=self.author.pk).delete()
+        response = self.client.get(reverse('posts:index'))
+        self.assertNotContains(response, self.post.text)
+
     def test_auth_user_comment(self):
         """авторизированный пользователь может комментировать записи"""
         comments_before = Comment.objects.all().count()
@@ -388,3 +437,167 @@ class PaginatorTests(TestCase):
         self.paginator_create_post(reverse(
             'posts:profile',
             kwargs={'username': self.author}))
+
+    def test_cursor_paginator_pages(self):
+        """курсорная пагинация листает ленту вперед и назад без пропусков"""
+        path = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        first_page = self.author_client.get(path + '?after=').context[
+            'page_obj']
+        self.assertIsInstance(first_page, Page)
+        self.assertEqual(len(first_page), FIRST_PAGE_RECORDS)
+        self.assertTrue(first_page.has_next())
+        self.assertFalse(first_page.has_previous())
+        second_page = self.author_client.get(
+            f'{path}?after={first_page.next_cursor}').context['page_obj']
+        self.assertEqual(len(second_page), SECOND_PAGE_RECORDS)
+        self.assertFalse(second_page.has_next())
+        self.assertTrue(second_page.has_previous())
+        ids = [post.id for post in first_page] + [
+            post.id for post in second_page]
+        self.assertEqual(ids, list(Post.objects.order_by(
+            '-pub_date', '-pk').values_list('id', flat=True)))
+        previous_page = self.author_client.get(
+            f'{path}?before={second_page.previous_cursor}').context[
+            'page_obj']
+        self.assertEqual(
+            [post.id for post in previous_page],
+            [post.id for post in first_page]
+        )
+        self.assertFalse(previous_page.has_previous())
+
+    def test_cursor_paginator_edges(self):
+        """курсор за краем ленты или на удаленный пост не ломает страницу"""
+        path = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        posts = list(Post.objects.filter(group=self.group).order_by(
+            '-pub_date', '-pk'))
+        newest = encode_cursor(posts[0].pub_date, posts[0].pk)
+        oldest = encode_cursor(posts[-1].pub_date, posts[-1].pk)
+        empty_pages = {
+            f'{path}?after={oldest}': (False, True),
+            f'{path}?before={newest}': (True, False),
+        }
+        for url, (has_next, has_previous) in empty_pages.items():
+            with self.subTest(url=url):
+                response = self.author_client.get(url)
+                self.assertEqual(response.status_code, 200)
+                page_obj = response.context['page_obj']
+                self.assertEqual(len(page_obj), 0)
+                self.assertEqual(page_obj.has_next(), has_next)
+                self.assertEqual(page_obj.has_previous(), has_previous)
+        Post.objects.filter(pk=posts[-1].pk).delete()
+        page_obj = self.author_client.get(
+            f'{path}?after={encode_cursor(posts[-2].pub_date, posts[-2].pk)}'
+        ).context['page_obj']
+        self.assertEqual(len(page_obj), 0)
+        self.assertFalse(page_obj.has_next())
+        self.assertIsNone(page_obj.next_cursor)
+
+    def test_cursor_paginator_keeps_query(self):
+        """ссылки курсорной пагинации сохраняют другие параметры"""
+        path = reverse('posts:group_list', kwargs={'slug': self.group.slug})
+        response = self.author_client.get(path + '?after=&utm=feed')
+        page_obj = response.context['page_obj']
+        self.assertContains(
+            response, f'?after={page_obj.next_cursor}&utm=feed')
+
+    @override_settings(POSTS_CURSOR_PAGINATION=True)
+    def test_cursor_paginator_setting(self):
+        """настройка включает курсорную пагинацию, битый курсор игнорируется"""
+        fields = {
+            reverse('posts:index'): FIRST_PAGE_RECORDS,
+            reverse('posts:index') + '?after=broken': FIRST_PAGE_RECORDS,
+            reverse('posts:profile',
+                    kwargs={'username': self.author}
+                    ): FIRST_PAGE_RECORDS,
+        }
+        for path, records in fields.items():
+            with self.subTest(path=path):
+                response = self.author_client.get(path)
+                page_obj = response.context['page_obj']
+                self.assertTrue(page_obj.paginator.is_cursor)
+                self.assertEqual(len(page_obj), records)
+                self.assertContains(response, page_obj.next_cursor)
+
+
+class PostsViewsQueriesTest(QueryCountMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('author')
+        cls.user = User.objects.create_user('user')
+        cls.group = Group.objects.create(
+            title='test group',
+            slug='test-slug',
+            description='description'
+        )
+        Follow.objects.create(user=cls.user, author=cls.author)
+        cls.add_posts()
+
+    @classmethod
+    def add_posts(cls, count=2):
+        for num in range(count):
+            post = Post.objects.create(
+                text=f'test text {num}',
+                author=cls.author,
+                group=cls.group
+            )
+            Comment.objects.create(
+                text='comment', author=cls.user, post=post)
+
+    def setUp(self):
+        self.user_client = Client()
+        self.user_client.force_login(self.user)
+
+    def test_feed_queries_do_not_grow_with_posts(self):
+        """число запросов ленты не зависит от числа постов на странице"""
+        paths = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:follow_index'),
+        )
+        for path in paths:
+            with self.subTest(path=path):
+                def request():
+                    cache.clear()
+                    self.user_client.get(path)
+                self.assertQueriesIndependentOf(request, self.add_posts)
+
+    @override_settings(QUERY_DUPLICATES_RAISE=True)
+    def test_pages_have_no_duplicate_queries(self):
+        """на страницах нет повторяющихся запросов (N+1)"""
+        self.add_posts(10)
+        post = Post.objects.first()
+        for _ in range(10):
+            Comment.objects.create(text='comment', author=self.user, post=post)
+        paths = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.author}),
+            reverse('posts:follow_index'),
+            reverse('posts:post_details', kwargs={'post_id': post.pk}),
+        )
+        for path in paths:
+            with self.subTest(path=path):
+                cache.clear()
+                self.assertEqual(self.user_client.get(path).status_code, 200)
+
+    def test_feed_annotates_comment_count(self):
+        """карточки ленты получают число комментариев без доп. запросов"""
+        cache.clear()
+        response = self.user_client.get(reverse('posts:index'))
+        with self.assertMaxQueries(0):
+            counts = [post.comment_count for post in response.context[
+                'page_obj']]
+            groups = [post.group.slug for post in response.context[
+                'page_obj']]
+        self.assertEqual(counts, [1, 1])
+        self.assertEqual(groups, [self.group.slug] * 2)
+
+    def test_feed_query_has_no_group_by(self):
+        """число комментариев не группирует всю таблицу постов"""
+        page = Post.objects.for_feed()[:POSTS_ON_SCREEN]
+        sql = str(page.query).upper()
+        self.assertNotIn('GROUP BY', sql.split('FROM "POSTS_POST"')[-1])
+        self.assertNotIn('JOIN "POSTS_COMMENT"', sql)
+        self.assertNotIn('TEMP B-TREE', page.explain())
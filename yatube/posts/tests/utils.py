@@ -0,0 +1,30 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryCountMixin:
+    """Проверки числа SQL-запросов, чтобы N+1 ронял тесты."""
+
+    @contextmanager
+    def assertMaxQueries(self, limit):
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > limit:
+            queries = '\n'.join(
+                query['sql'] for query in context.captured_queries
+            )
+            self.fail(
+                f'Выполнено {executed} запросов, допустимо {limit}:\n'
+                f'{queries}'
+            )
+
+    def assertQueriesIndependentOf(self, request, grow):
+        """Число запросов request() не меняется после вызова grow()."""
+        with CaptureQueriesContext(connection) as before:
+            request()
+        grow()
+        with self.assertMaxQueries(len(before.captured_queries)):
+            request()
@@ -0,0 +1,59 @@
+"""Фоновая подготовка миниатюр и вариантов картинок постов.
+
+Размеры должны совпадать с тегами {% thumbnail %} в шаблонах, тогда
+при показе поста sorl только читает готовую запись из хранилища.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import connections, transaction
+from sorl.thumbnail import get_thumbnail
+
+from . import variants
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.POSTS_THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def generate(post):
+    for geometry, options in THUMBNAIL_SIZES:
+        get_thumbnail(post.image, geometry, **options)
+    variants.generate(post)
+
+
+def _generate_safely(post, in_worker=False):
+    try:
+        generate(post)
+    except Exception:
+        logger.exception(
+            'Не удалось подготовить миниатюры %s', post.image.name)
+    finally:
+        if in_worker:
+            connections.close_all()
+
+
+def schedule(post):
+    """Готовит миниатюры поста после фиксации транзакции."""
+    if not post.image:
+        return
+    if settings.POSTS_THUMBNAIL_WORKERS:
+        transaction.on_commit(
+            lambda: get_executor().submit(_generate_safely, post, True))
+    else:
+        transaction.on_commit(lambda: _generate_safely(post))
@@ -0,0 +1,282 @@
+"""Выгрузка и загрузка данных Yatube в формате NDJSON.
+
+Каждая строка — объект с полем type. Записи идут в порядке зависимостей:
+пользователи, сообщества, посты, комментарии, подписки. Пользователи и
+сообщества сопоставляются по username и slug, посты и комментарии — по
+автору и дате и по возможности сохраняют свои id, поэтому повторная
+загрузка того же файла безопасна.
+"""
+import datetime
+import json
+from contextlib import contextmanager
+
+from django.core.management.color import no_style
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils.dateparse import parse_datetime
+
+from . import feed, stats, trending
+from .models import Comment, Follow, Group, Post, User
+from .search import get_backend
+from .versions import INDEX_SCOPE, bump_version
+
+USER_FIELDS = (
+    'username', 'first_name', 'last_name', 'email', 'password',
+    'date_joined',
+)
+GROUP_FIELDS = ('slug', 'title', 'description')
+POST_FIELDS = (
+    'id', 'text', 'pub_date', 'author__username', 'group__slug', 'image',
+)
+COMMENT_FIELDS = ('id', 'post_id', 'author__username', 'text', 'created')
+FOLLOW_FIELDS = ('user__username', 'author__username')
+
+EXPORTS = (
+    ('user', User.objects.order_by('pk'), USER_FIELDS),
+    ('group', Group.objects.order_by('pk'), GROUP_FIELDS),
+    ('post', Post.objects.order_by('pk'), POST_FIELDS),
+    ('comment', Comment.objects.order_by('pk'), COMMENT_FIELDS),
+    ('follow', Follow.objects.order_by('pk'), FOLLOW_FIELDS),
+)
+TYPES = [record_type for record_type, _, _ in EXPORTS]
+
+
+class RecordEncoder(DjangoJSONEncoder):
+    # DjangoJSONEncoder обрезает время до миллисекунд
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def export(stream, batch_size=1000):
+    """Пишет все данные в поток и возвращает число записей по типам."""
+    written = dict.fromkeys(TYPES, 0)
+    for record_type, queryset, fields in EXPORTS:
+        rows = queryset.values_list(*fields).iterator(chunk_size=batch_size)
+        for row in rows:
+            record = dict(zip(fields, row), type=record_type)
+            stream.write(json.dumps(
+                record, cls=RecordEncoder, ensure_ascii=False) + '\n')
+            written[record_type] += 1
+    return written
+
+
+@contextmanager
+def keep_dates():
+    """Отключает auto_now_add, чтобы сохранить даты из файла."""
+    fields = [
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+    ]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Importer:
+    """Загружает записи пачками по batch_size, каждую в своей транзакции.
+
+    Посты и комментарии узнаются по автору и дате: уже загруженные
+    пропускаются. Если id из файла занят другой записью, она получает
+    новый id, а комментарии привязываются к посту через карту old → new.
+    В loaded попадают только вставленные строки.
+
+    bulk_create не посылает сигналы, поэтому счетчики, поисковый индекс
+    и ленты после загрузки нужно пересобрать.
+    """
+
+    def __init__(self, batch_size=1000):
+        self.batch_size = batch_size
+        self.user_ids = {}
+        self.group_ids = {}
+        self.post_ids = {}
+        self.pending_type = None
+        self.pending = []
+        self.loaded = dict.fromkeys(TYPES, 0)
+
+    def load(self, lines):
+        with keep_dates():
+            for number, line in enumerate(lines, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                    record_type = record.pop('type')
+                except (ValueError, KeyError):
+                    raise ValueError(f'Строка {number}: неверная запись')
+                if record_type not in TYPES:
+                    raise ValueError(
+                        f'Строка {number}: неизвестный тип {record_type}')
+                self.add(record_type, record)
+            self.flush()
+        if self.loaded['post'] or self.loaded['comment']:
+            self.reset_sequences()
+        return self.loaded
+
+    def add(self, record_type, record):
+        if record_type != self.pending_type:
+            self.flush()
+            self.pending_type = record_type
+        self.pending.append(record)
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        try:
+            with transaction.atomic():
+                inserted = getattr(self, f'load_{self.pending_type}s')(
+                    self.pending)
+        except KeyError as error:
+            raise ValueError(f'Не найдена запись {error}')
+        self.loaded[self.pending_type] += inserted
+        self.pending = []
+
+    def resolve(self, ids, model, field, keys):
+        """Дополняет словарь ключ → pk недостающими ключами одним запросом."""
+        missing = {key for key in keys if key and key not in ids}
+        if missing:
+            ids.update(model.objects.filter(
+                **{f'{field}__in': missing}
+            ).values_list(field, 'pk'))
+        return ids
+
+    def users(self, records, *fields):
+        return self.resolve(self.user_ids, User, 'username', (
+            record[field] for record in records for field in fields))
+
+    def create_missing(self, model, field, records, build):
+        """Создает записи, ключа field которых еще нет в базе."""
+        existing = set(model.objects.filter(**{
+            f'{field}__in': [record[field] for record in records]
+        }).values_list(field, flat=True))
+        objects = [
+            build(record) for record in records
+            if record[field] not in existing
+        ]
+        model.objects.bulk_create(objects, ignore_conflicts=True)
+        return len(objects)
+
+    def load_users(self, records):
+        return self.create_missing(User, 'username', records, lambda record: (
+            User(**{
+                field: record[field] for field in USER_FIELDS
+                if field in record
+            })
+        ))
+
+    def load_groups(self, records):
+        return self.create_missing(
+            Group, 'slug', records, lambda record: Group(**record))
+
+    def place(self, model, objects, key):
+        """Назначает id новым записям и возвращает карту id из файла → id.
+
+        Запись с тем же ключом key (автор и дата) уже загружена; занятый
+        чужой записью id заменяется следующим свободным.
+        """
+        authors = {obj.author_id for obj in objects.values()}
+        dates = {getattr(obj, key) for obj in objects.values()}
+        known = {
+            (author_id, date): pk
+            for pk, author_id, date in model.objects.filter(
+                author__in=authors, **{f'{key}__in': dates}
+            ).values_list('pk', 'author', key)
+        }
+        taken = set(model.objects.filter(
+            pk__in=objects).values_list('pk', flat=True))
+        next_id = max(
+            model.objects.aggregate(last=Max('pk'))['last'] or 0, *objects
+        ) + 1
+        ids, new = {}, []
+        for old_id, obj in objects.items():
+            found = known.get((obj.author_id, getattr(obj, key)))
+            if found is not None:
+                ids[old_id] = found
+                continue
+            if old_id in taken:
+                obj.pk, next_id = next_id, next_id + 1
+            else:
+                obj.pk = old_id
+            ids[old_id] = obj.pk
+            new.append(obj)
+        model.objects.bulk_create(new)
+        return ids, len(new)
+
+    def load_posts(self, records):
+        users = self.users(records, 'author__username')
+        groups = self.resolve(self.group_ids, Group, 'slug', (
+            record['group__slug'] for record in records))
+        ids, inserted = self.place(Post, {
+            record['id']: Post(
+                text=record['text'],
+                pub_date=parse_datetime(record['pub_date']),
+                author_id=users[record['author__username']],
+                group_id=groups.get(record['group__slug']),
+                image=record.get('image') or '',
+            )
+            for record in records
+        }, 'pub_date')
+        self.post_ids.update(ids)
+        return inserted
+
+    def load_comments(self, records):
+        users = self.users(records, 'author__username')
+        _, inserted = self.place(Comment, {
+            record['id']: Comment(
+                post_id=self.post_ids[record['post_id']],
+                author_id=users[record['author__username']],
+                text=record['text'],
+                created=parse_datetime(record['created']),
+            )
+            for record in records
+        }, 'created')
+        return inserted
+
+    def load_follows(self, records):
+        users = self.users(records, 'user__username', 'author__username')
+        pairs = {
+            (users[record['user__username']],
+             users[record['author__username']])
+            for record in records
+        }
+        existing = set(Follow.objects.filter(
+            user__in={user_id for user_id, _ in pairs},
+            author__in={author_id for _, author_id in pairs},
+        ).values_list('user', 'author'))
+        Follow.objects.bulk_create(
+            [
+                Follow(user_id=user_id, author_id=author_id)
+                for user_id, author_id in pairs - existing
+            ],
+            ignore_conflicts=True,
+        )
+        return len(pairs - existing)
+
+    def reset_sequences(self):
+        # явные id не сдвигают последовательности на PostgreSQL и Oracle
+        statements = connection.ops.sequence_reset_sql(
+            no_style(), [Post, Comment])
+        with connection.cursor() as cursor:
+            for sql in statements:
+                cursor.execute(sql)
+
+
+def rebuild_derived(batch_size=1000):
+    """Пересобирает то, что обычно поддерживают сигналы."""
+    with transaction.atomic():
+        stats.rebuild_all(batch_size)
+        get_backend().rebuild()
+        trending.rebuild(batch_size)
+    bump_version(INDEX_SCOPE)
+    if feed.is_enabled():
+        readers = User.objects.filter(follower__isnull=False).distinct()
+        for user in readers.iterator():
+            feed.rebuild(user)
@@ -0,0 +1,157 @@
+"""Популярные посты и сообщества по недавней активности.
+
+Рейтинг — прямое затухание (forward decay) в логарифмах: событие с весом
+w в момент t добавляет w * 2 ** ((t - EPOCH) / half-life). Уже набранные
+очки не пересчитываются, новые события просто весят больше, а порядок
+тот же, что при обычном экспоненциальном затухании. Логарифм не дает
+числу переполниться, поэтому рейтинг хранится в индексированном поле
+и страница читает его одним запросом.
+"""
+import datetime
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import (
+    Comment, Post, TrendingGroup, TrendingPost, comment_count
+)
+
+EPOCH = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+POST_WEIGHT = 1.0
+COMMENT_WEIGHT = 2.0
+FOLLOW_WEIGHT = 1.0
+
+
+def event_score(weight, when=None):
+    """Логарифм вклада одного события."""
+    elapsed = ((when or timezone.now()) - EPOCH).total_seconds()
+    half_life = settings.POSTS_TRENDING_HALF_LIFE
+    return math.log(weight) + elapsed * math.log(2) / half_life
+
+
+def log_add(first, second):
+    """log(exp(first) + exp(second)) без переполнения."""
+    high, low = max(first, second), min(first, second)
+    return high + math.log1p(math.exp(low - high))
+
+
+def window_start():
+    return timezone.now() - datetime.timedelta(
+        seconds=settings.POSTS_TRENDING_WINDOW)
+
+
+def cutoff():
+    """Порог: столько набирает пост, опубликованный POSTS_TRENDING_WINDOW
+    назад без единого комментария."""
+    return event_score(POST_WEIGHT, window_start())
+
+
+def add_scores(model, scores):
+    """Добавляет очки объектам модели: pk → логарифм вклада."""
+    scores = {pk: score for pk, score in scores.items() if pk is not None}
+    if not scores:
+        return
+    with transaction.atomic():
+        current = dict(model.objects.select_for_update().filter(
+            pk__in=scores).values_list('pk', 'score'))
+        model.objects.bulk_update(
+            [
+                model(pk=pk, score=log_add(current[pk], scores[pk]))
+                for pk in current
+            ],
+            ['score'],
+        )
+        model.objects.bulk_create(
+            [
+                model(pk=pk, score=score)
+                for pk, score in scores.items() if pk not in current
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def record_post(post):
+    score = event_score(POST_WEIGHT, post.pub_date)
+    add_scores(TrendingPost, {post.pk: score})
+    add_scores(TrendingGroup, {post.group_id: score})
+
+
+def record_comment(comment):
+    score = event_score(COMMENT_WEIGHT, comment.created)
+    add_scores(TrendingPost, {comment.post_id: score})
+    add_scores(TrendingGroup, {comment.post.group_id: score})
+
+
+def record_follows(author_ids):
+    """Новые подписчики поднимают свежие посты автора."""
+    since = window_start()
+    score = event_score(FOLLOW_WEIGHT)
+    counts = defaultdict(int)
+    for post_id in Post.objects.filter(
+            author__in=author_ids, pub_date__gte=since
+    ).order_by().values_list('pk', flat=True):
+        counts[post_id] += 1
+    add_scores(TrendingPost, {
+        post_id: score + math.log(count)
+        for post_id, count in counts.items()
+    })
+
+
+def rebuild(batch_size=1000):
+    """Пересчитывает рейтинги по постам и комментариям за окно.
+
+    Даты подписок не хранятся, их вклад при пересчете теряется. Заодно
+    удаляются строки постов, выпавших из окна.
+    """
+    since = window_start()
+    posts, groups = {}, {}
+
+    def add(scores, pk, score):
+        if pk is not None:
+            scores[pk] = log_add(scores[pk], score) if pk in scores else score
+
+    events = [
+        (POST_WEIGHT, Post.objects.filter(pub_date__gte=since).values_list(
+            'pk', 'group', 'pub_date')),
+        (COMMENT_WEIGHT, Comment.objects.filter(
+            created__gte=since).values_list('post', 'post__group', 'created')),
+    ]
+    for weight, rows in events:
+        for post_id, group_id, when in rows.iterator(chunk_size=batch_size):
+            score = event_score(weight, when)
+            add(posts, post_id, score)
+            add(groups, group_id, score)
+    with transaction.atomic():
+        for model, scores in ((TrendingPost, posts), (TrendingGroup, groups)):
+            model.objects.all().delete()
+            model.objects.bulk_create(
+                [model(pk=pk, score=score) for pk, score in scores.items()],
+                batch_size=batch_size,
+            )
+
+
+def trending_posts():
+    """Строки рейтинга по индексу score, с постами и числом комментариев."""
+    return TrendingPost.objects.filter(
+        score__gte=cutoff()
+    ).select_related('post__author', 'post__group').annotate(
+        comment_count=comment_count('post')).order_by('-score')
+
+
+def as_posts(rows):
+    """Посты страницы рейтинга в виде, который ждет карточка."""
+    posts = []
+    for row in rows:
+        row.post.comment_count = row.comment_count
+        posts.append(row.post)
+    return posts
+
+
+def trending_groups(limit=None):
+    return TrendingGroup.objects.filter(
+        score__gte=cutoff()
+    ).select_related('group').order_by('-score')[
+        :limit or settings.POSTS_TRENDING_GROUPS]
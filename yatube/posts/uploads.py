@@ -0,0 +1,76 @@
+"""Нормализация загружаемых картинок постов.
+
+Размеры проверяются по заголовку файла до декодирования, большие снимки
+уменьшаются (JPEG — сразу при декодировании), метаданные отбрасываются.
+JPEG, PNG, WebP и GIF сохраняются в своем формате, остальные форматы
+перекодируются в PNG при наличии прозрачности и в JPEG без нее.
+Анимация не поддерживается.
+"""
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from PIL import Image, ImageOps
+
+KEPT_INFO = ('transparency',)
+OUTPUT_FORMATS = ('JPEG', 'PNG', 'WEBP', 'GIF')
+# форматы, в которых несколько кадров — анимация, а не служебные снимки MPO
+ANIMATED_FORMATS = ('GIF', 'PNG', 'WEBP')
+CONTENT_TYPES = {'JPEG': 'image/jpeg', 'PNG': 'image/png'}
+EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png'}
+
+
+def output_format(image):
+    """Формат сохранения и режим, в который нужно перевести картинку."""
+    if image.format in OUTPUT_FORMATS:
+        return image.format, None
+    alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+    if alpha:
+        return 'PNG', 'RGBA'
+    return 'JPEG', None if image.mode in ('RGB', 'L', 'CMYK') else 'RGB'
+
+
+def normalize(upload):
+    if upload.size > settings.POSTS_IMAGE_MAX_UPLOAD_SIZE:
+        raise ValidationError(
+            'Файл слишком большой: не больше %(limit)d МБ.',
+            code='file_too_large',
+            params={'limit': settings.POSTS_IMAGE_MAX_UPLOAD_SIZE // 2 ** 20},
+        )
+    upload.seek(0)
+    image = Image.open(upload)
+    width, height = image.size
+    if width * height > settings.POSTS_IMAGE_MAX_PIXELS:
+        raise ValidationError(
+            'Картинка слишком большая: %(width)d×%(height)d.',
+            code='image_too_large',
+            params={'width': width, 'height': height},
+        )
+    if (image.format in ANIMATED_FORMATS
+            and getattr(image, 'n_frames', 1) > 1):
+        raise ValidationError(
+            'Анимированные картинки не поддерживаются.',
+            code='image_animated',
+        )
+    source_format = image.format
+    image_format, mode = output_format(image)
+    image.draft(image.mode, settings.POSTS_IMAGE_MAX_SIZE)
+    image = ImageOps.exif_transpose(image)
+    image.thumbnail(settings.POSTS_IMAGE_MAX_SIZE, Image.LANCZOS)
+    if mode is not None:
+        image = image.convert(mode)
+    image.info = {
+        key: value for key, value in image.info.items() if key in KEPT_INFO
+    }
+    buffer = BytesIO()
+    image.save(
+        buffer, image_format,
+        quality=settings.POSTS_IMAGE_QUALITY, optimize=True,
+    )
+    name, content_type = upload.name, upload.content_type
+    if image_format != source_format:
+        name = os.path.splitext(name)[0] + EXTENSIONS[image_format]
+        content_type = CONTENT_TYPES[image_format]
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type)
@@ -8,7 +8,14 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_posts, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('search/', views.search, name='search'),
+    path('trending/', views.trending, name='trending'),
     path('posts/<int:post_id>/', views.post_details, name='post_details'),
+    path(
+        'posts/<int:post_id>/comments/',
+        views.post_comments,
+        name='post_comments'
+    ),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
     path(
@@ -17,6 +24,7 @@ urlpatterns = [
         name='add_comment'
     ),
     path('follow/', views.follow_index, name='follow_index'),
+    path('follow/batch/', views.follow_batch, name='follow_batch'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -0,0 +1,110 @@
+"""Уменьшенные копии картинок постов в современных форматах для srcset.
+
+Копии режутся в тех же пропорциях, что и миниатюра 960x339 из шаблонов,
+а их список хранится в Post.image_variants.
+"""
+import json
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .models import Post
+from .versions import bump_version, post_scope
+
+ASPECT_RATIO = 339 / 960
+FORMATS = (
+    ('avif', 'AVIF', 'image/avif'),
+    ('webp', 'WEBP', 'image/webp'),
+)
+
+
+def supported_formats():
+    Image.init()
+    return [fmt for fmt in FORMATS if fmt[1] in Image.SAVE]
+
+
+def variant_name(image_name, width, extension):
+    directory, filename = os.path.split(image_name)
+    stem = os.path.splitext(filename)[0]
+    return f'{directory}/variants/{stem}-{width}.{extension}'
+
+
+def parse_manifest(text):
+    return json.loads(text) if text else {}
+
+
+def load_manifest(post):
+    return parse_manifest(post.image_variants)
+
+
+def sources(post):
+    """Атрибуты <source> для тега <picture> из сохраненного манифеста."""
+    storage = post.image.storage
+    return [
+        {
+            'type': mime,
+            'srcset': ', '.join(
+                f'{storage.url(name)} {width}w' for width, name in variants
+            ),
+        }
+        for mime, variants in load_manifest(post).items()
+    ]
+
+
+def _open_source(image):
+    with image.open('rb'):
+        source = Image.open(image)
+        source = ImageOps.exif_transpose(source)
+    if source.mode not in ('RGB', 'RGBA'):
+        source = source.convert('RGBA')
+    return source
+
+
+def _encode(image, pil_format):
+    buffer = BytesIO()
+    image.save(
+        buffer, pil_format, quality=settings.POSTS_IMAGE_VARIANT_QUALITY)
+    return ContentFile(buffer.getvalue())
+
+
+def delete(manifest, storage):
+    for variants in manifest.values():
+        for _, name in variants:
+            storage.delete(name)
+
+
+def _save_manifest(post, text):
+    post.image_variants = text
+    Post.objects.filter(pk=post.pk).update(image_variants=text)
+    bump_version(post_scope(post.pk))
+
+
+def generate(post):
+    storage = post.image.storage
+    # одинаковая картинка в хранилище с дедупликацией уже нарезана
+    existing = Post.objects.filter(image=post.image.name).exclude(
+        pk=post.pk).exclude(image_variants='').values_list(
+        'image_variants', flat=True).first()
+    if existing:
+        _save_manifest(post, existing)
+        return parse_manifest(existing)
+    source = _open_source(post.image)
+    widths = [
+        width for width in settings.POSTS_IMAGE_VARIANT_WIDTHS
+        if width <= source.width
+    ] or [min(settings.POSTS_IMAGE_VARIANT_WIDTHS)]
+    manifest = {}
+    for extension, pil_format, mime in supported_formats():
+        manifest[mime] = []
+        for width in widths:
+            name = variant_name(post.image.name, width, extension)
+            variant = ImageOps.fit(
+                source, (width, round(width * ASPECT_RATIO)), Image.LANCZOS)
+            storage.delete(name)
+            name = storage.save(name, _encode(variant, pil_format))
+            manifest[mime].append([width, name])
+    _save_manifest(post, json.dumps(manifest))
+    return manifest
@@ -0,0 +1,161 @@
+"""Счетчики версий для ключей кэша.
+
+Запись данных увеличивает версию своей области, и все фрагменты,
+закэшированные под прежней версией, перестают читаться.
+"""
+import datetime
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.cache import cache_page
+from django.views.decorators.http import condition
+
+from core.routers import reading_replicas, use_replicas
+
+INDEX_SCOPE = 'posts:index'
+
+
+def version_key(scope):
+    return f'version:{scope}'
+
+
+def modified_key(scope):
+    return f'modified:{scope}'
+
+
+def _initial_version():
+    # после вытеснения ключа версия не должна совпасть с уже выданной
+    return int(time.time() * 1000)
+
+
+def get_version(scope):
+    key = version_key(scope)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key, _initial_version())
+    return version
+
+
+def bump_version(scope):
+    key = version_key(scope)
+    cache.set(modified_key(scope), time.time(), None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        version = _initial_version()
+        cache.set(key, version, None)
+        return version
+
+
+def get_versions(scopes):
+    """Версии нескольких областей одним обращением к кэшу."""
+    found = cache.get_many([version_key(scope) for scope in scopes])
+    return [
+        found.get(version_key(scope)) or get_version(scope)
+        for scope in scopes
+    ]
+
+
+def get_state(scopes):
+    """Версии областей и время последнего изменения любой из них."""
+    keys = [version_key(scope) for scope in scopes]
+    keys += [modified_key(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    versions = [
+        found.get(version_key(scope)) or get_version(scope)
+        for scope in scopes
+    ]
+    modified = []
+    for scope in scopes:
+        value = found.get(modified_key(scope))
+        if value is None:
+            # неизвестное время изменения — считаем, что это произошло сейчас
+            cache.add(modified_key(scope), time.time(), None)
+            value = cache.get(modified_key(scope), time.time())
+        modified.append(value)
+    return versions, max(modified)
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def versioned_cache_page(scope, timeout_setting):
+    """cache_page, ключ которого меняется при увеличении версии scope.
+
+    Страница для кэша собирается по основной базе: отстающая реплика
+    иначе закрепила бы старые данные под новой версией.
+    """
+    def decorator(view):
+        @wraps(view)
+        def from_primary(request, *args, **kwargs):
+            with use_replicas(False):
+                return view(request, *args, **kwargs)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            timeout = getattr(settings, timeout_setting)
+            if not timeout:
+                return view(request, *args, **kwargs)
+            cached_view = cache_page(
+                timeout,
+                key_prefix=f'{scope}:{get_version(scope)}'
+            )(from_primary)
+            return cached_view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def versioned_condition(scopes_func):
+    """Условный GET: ETag и Last-Modified из версий областей кэша.
+
+    scopes_func(request, **kwargs) возвращает области, от которых зависит
+    страница, или None, если объекта нет. Ответ 304 отдается без вызова
+    view и рендера шаблонов. POSTS_CONDITIONAL_GET = False отключает
+    заголовки, если версии не общие для всех процессов. При чтении
+    с реплик заголовки не выдаются: страница может быть старше версии.
+    """
+    def state(request, *args, **kwargs):
+        if not hasattr(request, '_versioned_state'):
+            scopes = scopes_func(request, *args, **kwargs)
+            request._versioned_state = scopes and get_state(scopes)
+        return request._versioned_state
+
+    def etag(request, *args, **kwargs):
+        found = state(request, *args, **kwargs)
+        if not found:
+            return None
+        versions, _ = found
+        raw = f'{versions}|{request.user.pk}|{request.get_full_path()}'
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def last_modified(request, *args, **kwargs):
+        found = state(request, *args, **kwargs)
+        if not found:
+            return None
+        return datetime.datetime.fromtimestamp(
+            found[1], tz=datetime.timezone.utc)
+
+    def decorator(view):
+        conditional = condition(
+            etag_func=etag, last_modified_func=last_modified)(view)
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if not settings.POSTS_CONDITIONAL_GET or reading_replicas():
+                return view(request, *args, **kwargs)
+            return conditional(request, *args, **kwargs)
+        return wrapper
+    return decorator
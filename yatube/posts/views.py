@@ -1,33 +1,109 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
 from django.core.paginator import Paginator
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404, redirect
+from django.template.loader import render_to_string
 from django.contrib.auth.decorators import login_required
-from django.views.decorators.cache import cache_page
+from django.views.decorators.http import require_POST
 
 from .models import Post, Group, User, Comment, Follow
+from . import feed, media, thumbnails
+from .follows import follow_many, unfollow_many
+from .suggestions import SUGGESTIONS_SCOPE, for_user as suggestions_for
+from .stats import get_stats
 from .forms import PostForm, CommentForm
+from .paginator import CursorPaginator
+from .search import search_posts
+from .trending import as_posts, trending_groups, trending_posts
+from .versions import (
+    INDEX_SCOPE, group_scope, post_scope, user_scope,
+    versioned_cache_page, versioned_condition
+)
 
 POSTS_ON_SCREEN = 10
+COMMENTS_ON_SCREEN = 20
 
 
-def add_paginator(request, object_list, per_page=POSTS_ON_SCREEN):
+def add_paginator(request, object_list, per_page=POSTS_ON_SCREEN,
+                  allow_cursor=True, cursor_field='pub_date'):
+    if allow_cursor and (settings.POSTS_CURSOR_PAGINATION
+                         or 'after' in request.GET or 'before' in request.GET):
+        page_obj = CursorPaginator(
+            object_list, per_page, field=cursor_field
+        ).get_page(
+            request.GET.get('after'), request.GET.get('before')
+        )
+        # остальные параметры запроса переносятся в ссылки на страницы
+        query = request.GET.copy()
+        for key in ('after', 'before', 'page'):
+            query.pop(key, None)
+        page_obj.query = query.urlencode()
+        return page_obj
     paginator = Paginator(object_list, per_page)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
 
 
-@cache_page(20, key_prefix='index_page')
+def index_scopes(request):
+    return [INDEX_SCOPE]
+
+
+def group_scopes(request, slug):
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True).first()
+    return group_id and [INDEX_SCOPE, group_scope(group_id)]
+
+
+def profile_scopes(request, username):
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True).first()
+    if not author_id:
+        return None
+    scopes = [INDEX_SCOPE, user_scope(author_id), SUGGESTIONS_SCOPE]
+    if request.user.is_authenticated:
+        # рекомендации зависят от подписок того, кто смотрит
+        scopes.append(user_scope(request.user.pk))
+    return scopes
+
+
+def post_scopes(request, post_id):
+    post = Post.objects.filter(pk=post_id).values(
+        'author_id', 'group_id').first()
+    if post is None:
+        return None
+    scopes = [post_scope(post_id), user_scope(post['author_id'])]
+    if post['group_id']:
+        scopes.append(group_scope(post['group_id']))
+    return scopes
+
+
+@versioned_condition(index_scopes)
+@versioned_cache_page(INDEX_SCOPE, 'POSTS_INDEX_CACHE_TIMEOUT')
 def index(request):
-    post_list = Post.objects.select_related('author').all()
+    post_list = Post.objects.for_feed()
     context = {
         'page_obj': add_paginator(request, post_list),
     }
     return render(request, 'posts/index.html', context)
 
 
+def trending(request):
+    page_obj = add_paginator(request, trending_posts(), allow_cursor=False)
+    page_obj.object_list = as_posts(page_obj)
+    context = {
+        'page_obj': page_obj,
+        'groups': trending_groups(),
+    }
+    return render(request, 'posts/trending.html', context)
+
+
+@versioned_condition(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    post_list = group.posts.select_related('author').all()
+    post_list = group.posts.for_feed()
     context = {
         'group': group,
         'page_obj': add_paginator(request, post_list),
@@ -35,9 +111,12 @@ def group_posts(request, slug):
     return render(request, 'posts/group_list.html', context)
 
 
+@versioned_condition(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.select_related('author')
+    author = get_object_or_404(
+        User.objects.select_related('stats'), username=username
+    )
+    post_list = author.posts.for_feed()
     if request.user.is_authenticated and Follow.objects.filter(
             user=request.user, author=author
     ).exists():
@@ -47,22 +126,59 @@ def profile(request, username):
 
     context = {
         'author': author,
+        'stats': get_stats(author),
         'page_obj': add_paginator(request, post_list),
         'following': following,
+        'suggestions': suggestions_for(
+            request.user, exclude={author.username}),
     }
     return render(request, 'posts/profile.html', context)
 
 
+def search(request):
+    query = request.GET.get('q', '').strip()
+    context = {
+        'query': query,
+        'page_query': urlencode({'q': query}),
+        'page_obj': add_paginator(
+            request, search_posts(query), allow_cursor=False
+        ),
+    }
+    return render(request, 'posts/search.html', context)
+
+
+@versioned_condition(post_scopes)
 def post_details(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
     context = {
         'post': post,
+        'author_stats': get_stats(post.author),
         'form': CommentForm(),
-        'comments': Comment.objects.filter(post=post)
+        'comments': add_comments_paginator(request, post.pk),
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+def add_comments_paginator(request, post_id):
+    comments = Comment.objects.filter(post_id=post_id).select_related('author')
+    return CursorPaginator(
+        comments, COMMENTS_ON_SCREEN, field='created'
+    ).get_page(request.GET.get('after'))
+
+
+def post_comments(request, post_id):
+    post = get_object_or_404(Post.objects.only('id'), pk=post_id)
+    comments = add_comments_paginator(request, post.pk)
+    return JsonResponse({
+        'html': render_to_string(
+            'includes/comments.html', {'comments': comments}, request
+        ),
+        'next': comments.next_cursor,
+    })
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -73,6 +189,7 @@ def post_create(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.schedule(post)
         return redirect('posts:profile', post.author)
     return render(request, 'posts/create_post.html', {'form': form})
 
@@ -91,13 +208,24 @@ def author_only(func):
 @author_only
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
+    old_image, old_variants = post.image, post.image_variants
     form = PostForm(
         request.POST or None,
         files=request.FILES or None,
         instance=post
     )
     if form.is_valid():
-        form.save()
+        post = form.save(commit=False)
+        if 'image' in form.changed_data:
+            # варианты прежней картинки удаляются: манифест сбрасывается
+            # тем же сохранением, пока фоновая нарезка не запишет новый
+            post.image_variants = ''
+        post.save()
+        if 'image' in form.changed_data:
+            # те же байты при дедупликации дают то же имя — файл остается
+            if old_image.name != post.image.name:
+                media.release(post.pk, old_image, old_variants)
+            thumbnails.schedule(post)
         return redirect('posts:post_details', post_id)
 
     context = {
@@ -121,9 +249,11 @@ def add_comment(request, post_id):
 
 @login_required()
 def follow_index(request):
-    follow_list = Post.objects.filter(author__following__user=request.user)
+    follow_list = feed.follow_feed(request.user).for_feed()
     context = {
-        'page_obj': add_paginator(request, follow_list),
+        'page_obj': add_paginator(
+            request, follow_list, cursor_field='feed_date'),
+        'suggestions': suggestions_for(request.user),
     }
     return render(request, 'posts/follow.html', context)
 
@@ -133,17 +263,50 @@ def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if request.user == author:
         return redirect('posts:profile', username=username)
-    Follow.objects.get_or_create(
+    _, created = Follow.objects.get_or_create(
         user=request.user,
         author=author
     )
+    if created:
+        feed.backfill(request.user, author)
     return redirect('posts:profile', username=username)
 
 
 @login_required()
 def profile_unfollow(request, username):
-    Follow.objects.filter(
+    author = get_object_or_404(User, username=username)
+    deleted, _ = Follow.objects.filter(
         user=request.user,
-        author=get_object_or_404(User, username=username)
+        author=author
     ).delete()
+    if deleted:
+        feed.trim(request.user, author)
     return redirect('posts:profile', username=username)
+
+
+@login_required
+@require_POST
+def follow_batch(request):
+    """Подписка (action=follow) или отписка на всех авторов из username."""
+    usernames = request.POST.getlist('username')
+    action = request.POST.get('action', 'follow')
+    if action not in ('follow', 'unfollow'):
+        return JsonResponse({'error': 'unknown action'}, status=400)
+    if len(usernames) > settings.POSTS_FOLLOW_BATCH_LIMIT:
+        return JsonResponse({'error': 'too many usernames'}, status=400)
+    authors = list(User.objects.filter(
+        username__in=usernames
+    ).exclude(pk=request.user.pk).only('username'))
+    if action == 'follow':
+        changed = follow_many(request.user, authors)
+        following = [author.username for author in authors]
+    else:
+        changed = unfollow_many(request.user, authors)
+        following = []
+    found = {author.username for author in authors}
+    return JsonResponse({
+        'following': sorted(following),
+        'changed': sorted(
+            author.username for author in authors if author.pk in changed),
+        'missing': sorted(set(usernames) - found - {request.user.username}),
+    })
@@ -1,3 +1,4 @@
+import importlib.util
 import os
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -30,6 +31,9 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.RequestMetricsMiddleware',
+    'core.middleware.QueryInspectorMiddleware',
+    'core.middleware.ReplicaMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -69,6 +73,37 @@ DATABASES = {
     }
 }
 
+# настройка соединений SQLite для боевой нагрузки (см. settings_production)
+SQLITE_TUNING = False
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'busy_timeout': 5000,
+    'temp_store': 'MEMORY',
+}
+
+# реплики только для чтения перечисляются через запятую в YATUBE_REPLICAS;
+# локально это копии db.sqlite3, которые обновляет команда sync_replicas
+DATABASE_REPLICAS = []
+for number, name in enumerate(
+        filter(None, os.getenv('YATUBE_REPLICAS', '').split(',')), 1):
+    DATABASES[f'replica_{number}'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, name),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica_{number}')
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+# с реплик читаются только модели этих приложений: сессии, пользователи
+# и таблица кэша всегда берутся с основной базы, иначе отставшая реплика
+# разлогинивает пользователя и отдает устаревшие версии кэша
+REPLICA_APPS = ('posts',)
+# после своей записи пользователь столько секунд читает с основной базы
+REPLICA_STICKY_SECONDS = 10
+REPLICA_STICKY_COOKIE = 'primary_until'
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -112,8 +147,96 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
-CACHES = {
-    'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+# ленты постов листаются курсором (?after=/?before=) вместо номеров страниц
+POSTS_CURSOR_PAGINATION = False
+
+# лента подписок раскладывается по читателям при публикации поста;
+# посты авторов, у которых подписчиков больше порога, читаются на лету
+POSTS_FEED_FANOUT = False
+POSTS_FEED_PULL_THRESHOLD = 1000
+POSTS_FEED_BACKFILL = 100
+
+# сколько авторов можно передать в posts:follow_batch за один запрос
+POSTS_FOLLOW_BATCH_LIMIT = 100
+
+# длина списка «на кого подписаться», который считает compute_suggestions
+POSTS_SUGGESTIONS_COUNT = 10
+
+# рейтинг популярного вдвое теряет вес за POSTS_TRENDING_HALF_LIFE секунд;
+# на странице — посты не слабее поста без комментариев возрастом в окно
+POSTS_TRENDING_HALF_LIFE = 6 * 60 * 60
+POSTS_TRENDING_WINDOW = 3 * 24 * 60 * 60
+POSTS_TRENDING_GROUPS = 10
+
+# HTML карточек постов кэшируется до изменения поста или его комментариев
+POSTS_CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# главная страница сбрасывается при публикации, правке и комментировании
+POSTS_INDEX_CACHE_TIMEOUT = 60 * 60
+
+# ETag и Last-Modified страниц из версий областей кэша (ответы 304)
+POSTS_CONDITIONAL_GET = True
+
+# миниатюры картинок готовятся в фоновых потоках; 0 — сразу после сохранения
+# (в отладке потоки не запускаются: они мешают тестовой базе в памяти)
+POSTS_THUMBNAIL_WORKERS = 0 if DEBUG else 2
+
+# ширины уменьшенных копий картинок для srcset (webp и avif, если доступен)
+POSTS_IMAGE_VARIANT_WIDTHS = (320, 640, 960)
+POSTS_IMAGE_VARIANT_QUALITY = 80
+
+# загружаемые картинки уменьшаются до POSTS_IMAGE_MAX_SIZE и пересохраняются
+# без метаданных; слишком большие файлы отклоняются до декодирования
+POSTS_IMAGE_MAX_SIZE = (1920, 1920)
+POSTS_IMAGE_MAX_PIXELS = 50_000_000
+POSTS_IMAGE_MAX_UPLOAD_SIZE = 20 * 1024 * 1024
+POSTS_IMAGE_QUALITY = 85
+
+# картинки постов хранятся под хэшем содержимого: одинаковые файлы
+# сохраняются один раз и удаляются вместе с последним ссылающимся постом
+POSTS_DEDUPLICATE_MEDIA = False
+
+# общий для всех воркеров кэш выбирается переменной окружения YATUBE_CACHE;
+# memcached и redis без установленного клиента заменяются локальным кэшем
+CACHE_BACKENDS = {
+    'locmem': ('core.cache.LocMemCache', None, ''),
+    'file': ('core.cache.FileBasedCache', None,
+             os.path.join(BASE_DIR, 'cache')),
+    'db': ('core.cache.DatabaseCache', None, 'yatube_cache'),
+    'memcached': ('core.cache.MemcachedCache', 'memcache',
+                  '127.0.0.1:11211'),
+    'redis': ('core.cache.RedisCache', 'django_redis',
+              'redis://127.0.0.1:6379/1'),
 }
+
+
+def select_cache(name, fallback='locmem'):
+    backend, client, location = CACHE_BACKENDS[name]
+    location = os.getenv('YATUBE_CACHE_LOCATION', location)
+    if client and importlib.util.find_spec(client) is None:
+        backend, _, location = CACHE_BACKENDS[fallback]
+    return {'default': {'BACKEND': backend, 'LOCATION': location}}
+
+
+CACHE_NAME = os.getenv('YATUBE_CACHE', 'locmem')
+CACHES = select_cache(CACHE_NAME)
+CACHE_STATS_FLUSH_EVERY = 100
+
+# замеры запросов по страницам: заголовок Server-Timing и /_metrics
+# со скользящей выборкой последних METRICS_WINDOW запросов; /_metrics
+# открыт персоналу, запросам с заголовком «Authorization: Bearer
+# METRICS_TOKEN» и адресам METRICS_ALLOWED_IPS
+METRICS_WINDOW = 1000
+METRICS_ALLOWED_IPS = ('127.0.0.1', '::1')
+METRICS_TOKEN = os.getenv('YATUBE_METRICS_TOKEN', '')
+# время рендера по каждому шаблону и include (дороже обычных замеров)
+METRICS_TEMPLATE_PROFILING = False
+
+# запросы дольше QUERY_SLOW_MS и одинаковые запросы, выполненные за одну
+# страницу больше QUERY_DUPLICATE_THRESHOLD раз, пишутся в журнал;
+# с QUERY_DUPLICATES_RAISE повторы считаются ошибкой (для тестов)
+QUERY_SLOW_MS = 100
+QUERY_DUPLICATE_THRESHOLD = 5
+QUERY_DUPLICATES_RAISE = False
+# sorl читает ключи миниатюр по одному, но держит их в кэше
+QUERY_DUPLICATE_IGNORE = ('"thumbnail_kvstore"',)
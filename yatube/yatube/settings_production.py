@@ -0,0 +1,48 @@
+"""Настройки боевого сервера.
+
+Включаются через DJANGO_SETTINGS_MODULE=yatube.settings_production.
+"""
+import copy
+import os
+
+from .settings import *  # noqa: F401,F403
+from .settings import (
+    CACHE_BACKENDS, DATABASES, SECRET_KEY, TEMPLATES, select_cache
+)
+
+DEBUG = False
+
+SECRET_KEY = os.getenv('YATUBE_SECRET_KEY', SECRET_KEY)
+ALLOWED_HOSTS = os.getenv('YATUBE_ALLOWED_HOSTS', 'localhost').split(',')
+
+# шаблоны разбираются один раз на процесс и дальше берутся из памяти
+TEMPLATES = copy.deepcopy(TEMPLATES)
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+# WAL и прочие PRAGMA из SQLITE_PRAGMAS, соединения живут между запросами
+SQLITE_TUNING = True
+DATABASES = copy.deepcopy(DATABASES)
+for database in DATABASES.values():
+    database['CONN_MAX_AGE'] = 60
+
+POSTS_THUMBNAIL_WORKERS = 2
+
+# за обратным прокси все запросы приходят с 127.0.0.1, поэтому /_metrics
+# доступен только персоналу и по токену YATUBE_METRICS_TOKEN
+METRICS_ALLOWED_IPS = ()
+
+# версии областей кэша должны быть общими для всех воркеров, поэтому
+# по умолчанию кэш файловый; с локальным кэшем каждый воркер видел бы
+# только свои сбросы версий и отдавал устаревшие страницы и ответы 304
+CACHE_NAME = os.getenv('YATUBE_CACHE', 'file')
+CACHES = select_cache(CACHE_NAME, fallback='file')
+if CACHES['default']['BACKEND'] == CACHE_BACKENDS['locmem'][0]:
+    POSTS_INDEX_CACHE_TIMEOUT = 0
+    POSTS_CARD_CACHE_TIMEOUT = 0
+    POSTS_CONDITIONAL_GET = False